@@ -0,0 +1,445 @@
+import os
+import csv
+import sys
+import json
+import time
+import wave
+import shlex
+import random
+import shutil
+import argparse
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+
+REPO_DIR = Path(__file__).resolve().parent
+DEFAULT_RESULTS_FILE = "benchmark_results.jsonl"
+DEFAULT_WORK_DIR = "benchmark"
+SCENARIOS = ["phrases", "spotter", "utils"]
+CHUNK_SIZE = 4096  # Bytes the mock server writes at a time
+SILENCE_SECONDS = 0.15  # Silence the mock audio and the corpus clips start and end with
+
+# Every utils/ tool the utils scenario runs on the synthetic corpus; {corpus} and {work} are filled in
+UTILS_BENCHMARKS = [
+    ("validate_pack", ["validate_pack.py", "--input_folder", "{corpus}", "--report", "{work}/validate_report.json"]),
+    ("trim_silence", ["trim_silence.py", "--input_folder", "{corpus}", "--output_folder", "{work}/trimmed"]),
+    ("process_pack", ["process_pack.py", "--input_folder", "{corpus}", "--output_folder", "{work}/processed",
+                      "--stages", "radio", "resample=32000"]),
+    ("reduce_wav_size", ["reduce_wav_size.py", "{corpus}", "--streaming"]),
+    ("radio_filter", ["radio_filter.py", "--input_folder", "{corpus}", "--streaming"]),
+    ("increase_gain", ["increase_gain.py", "--input_folder", "{corpus}", "--gain", "5", "--streaming"]),
+    ("pack_archive", ["pack_archive.py", "pack", "--archive", "{work}/voice.vpak", "--input_folder", "{corpus}"]),
+    ("extract_subtites", ["extract_subtites.py", "--folder", "{corpus}", "--full"]),
+]
+
+
+def speech_like(seconds: float, sample_rate: int, rng: random.Random) -> np.ndarray:
+    # A few syllable-like tone bursts between short silences, 16-bit mono. Quiet enough not to
+    # clip, loud enough not to count as silence, with silence at both ends for the trimmers.
+    voiced = max(seconds - 2 * SILENCE_SECONDS, 0.05)
+    t = np.arange(int(voiced * sample_rate)) / sample_rate
+    syllables = max(int(voiced * 4), 1)
+    envelope = np.abs(np.sin(np.pi * syllables * t / voiced)) ** 0.5
+    pitch = rng.uniform(100, 220)
+    tone = np.sin(2 * np.pi * pitch * t) + 0.4 * np.sin(2 * np.pi * 2.7 * pitch * t)
+    silence = np.zeros(int(SILENCE_SECONDS * sample_rate))
+    return (np.concatenate([silence, 6000 * envelope * tone, silence])).astype("<i2")
+
+
+class MockTTSServer:
+    # Stand-in for the ElevenLabs text-to-speech endpoint on a local port. Every request waits
+    # latency (+ up to jitter) before the response starts, fails with a 429 or 500 with
+    # probability error_rate, and otherwise returns audio_seconds of audio in the requested
+    # output_format. MP3 payloads are encoded once per format with ffmpeg.
+    def __init__(
+        self, latency_ms: float, jitter_ms: float, error_rate: float, audio_seconds: float, seed: int = 1, port: int = 0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.audio_seconds = audio_seconds
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._payloads = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def summary(self) -> dict:
+        return {"requests": self.requests, "errors": self.errors, "bytes_sent": self.bytes_sent}
+
+    def payload(self, output_format: str) -> bytes:
+        with self._lock:
+            if output_format not in self._payloads:
+                codec, rate = output_format.split("_")[:2]
+                pcm = speech_like(self.audio_seconds, int(rate), random.Random(rate)).tobytes()
+                if codec == "mp3":
+                    command = ["ffmpeg", "-loglevel", "error", "-f", "s16le", "-ar", rate, "-ac", "1", "-i", "-",
+                               "-b:a", f"{output_format.split('_')[2]}k", "-f", "mp3", "-"]
+                    pcm = subprocess.run(command, input=pcm, stdout=subprocess.PIPE, check=True).stdout
+                self._payloads[output_format] = pcm
+            return self._payloads[output_format]
+
+    def _next_request(self) -> tuple:
+        # (delay in seconds, error status or None), drawn under the lock so a seed gives the same run
+        with self._lock:
+            self.requests += 1
+            delay = (self.latency_ms + self._rng.uniform(0, self.jitter_ms)) / 1000
+            status = None
+            if self._rng.random() < self.error_rate:
+                self.errors += 1
+                status = self._rng.choice([429, 500])
+            return delay, status
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                delay, status = server._next_request()
+                time.sleep(delay)
+                if status is not None:
+                    body = json.dumps({"detail": "mock error"}).encode()
+                    self.send_response(status)
+                else:
+                    output_format = parse_qs(urlparse(self.path).query).get("output_format", ["mp3_44100_128"])[0]
+                    body = server.payload(output_format)
+                    self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                for start in range(0, len(body), CHUNK_SIZE):
+                    self.wfile.write(body[start:start + CHUNK_SIZE])
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def subset_phrases(subtitles_file: str, max_phrases: int = None) -> dict:
+    # The first max_phrases phrases of a subtitles JSON (all if None), keeping its categories
+    with open(subtitles_file, "r") as f:
+        phrases = json.load(f)
+    subset = {}
+    count = 0
+    for category, phrases_list in phrases.items():
+        for phrase_key, variants in phrases_list.items():
+            if count == max_phrases:
+                return subset
+            subset.setdefault(category, {})[phrase_key] = variants
+            count += 1
+    return subset
+
+
+def write_corpus(corpus_dir: Path, phrases: dict, files: int, sample_rate: int, seed: int) -> int:
+    # A pack shaped like examples/voice, <category>/<phrase>/<phrase>_<n>.wav with a
+    # subtitles.csv per phrase, with the categories and texts of a subtitles JSON.
+    # Deterministic for a seed; stops after `files` clips.
+    rng = random.Random(seed)
+    written = 0
+    while written < files:
+        for category, phrases_list in phrases.items():
+            for phrase_key, variants in phrases_list.items():
+                phrase_dir = corpus_dir / category / phrase_key
+                phrase_dir.mkdir(parents=True, exist_ok=True)
+                rows = []
+                for index, text in enumerate(variants or [phrase_key], start=1):
+                    if written == files:
+                        break
+                    filename = f"{phrase_key}_{index}.wav"
+                    samples = speech_like(rng.uniform(0.8, 2.5), sample_rate, rng)
+                    with wave.open(str(phrase_dir / filename), "wb") as wav:
+                        wav.setnchannels(1)
+                        wav.setsampwidth(2)
+                        wav.setframerate(sample_rate)
+                        wav.writeframes(samples.tobytes())
+                    rows.append([filename, text])
+                    written += 1
+                if rows:
+                    with open(phrase_dir / "subtitles.csv", "a", newline="") as csvfile:
+                        csv.writer(csvfile).writerows(rows)
+                if written == files:
+                    return written
+        if not written:
+            break
+        phrases = {f"{category}_copy": phrases_list for category, phrases_list in phrases.items()}
+    return written
+
+
+def prepare_corpus(corpus_dir: Path, phrases: dict, files: int, sample_rate: int, seed: int) -> None:
+    # Reused between runs while its settings are the same, so the utils timings do not include writing it
+    settings = {"files": files, "sample_rate": sample_rate, "seed": seed}
+    marker = corpus_dir.parent / "corpus.json"
+    if marker.exists() and corpus_dir.is_dir() and json.loads(marker.read_text()) == settings:
+        return
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    print(f"Writing a synthetic corpus of {files} clips to {corpus_dir}")
+    write_corpus(corpus_dir, phrases, files, sample_rate, seed)
+    marker.write_text(json.dumps(settings))
+
+
+def count_clips(folder: Path) -> tuple:
+    # (clips, characters) listed in the subtitles.csv files under folder
+    clips = 0
+    chars = 0
+    for subtitles_file in folder.rglob("subtitles.csv"):
+        with open(subtitles_file, newline="") as csvfile:
+            for row in csv.reader(csvfile):
+                if row:
+                    clips += 1
+                    chars += len(row[1]) if len(row) > 1 else 0
+    return clips, chars
+
+
+def run_measured(command: list, cwd: Path, log_file: Path) -> dict:
+    # Wall time, CPU time and peak RSS of a command. The peak RSS is that of the largest
+    # process of the run (the script, or an ffmpeg or worker process it waited for).
+    started = time.perf_counter()
+    with open(log_file, "w") as log:
+        process = subprocess.Popen(command, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            cpu_s = usage.ru_utime + usage.ru_stime
+            max_rss_mb = usage.ru_maxrss / 1024  # KB on Linux
+        else:
+            process.wait()
+            cpu_s = max_rss_mb = None
+    wall_s = time.perf_counter() - started
+    return {
+        "wall_s": round(wall_s, 3),
+        "cpu_s": round(cpu_s, 3) if cpu_s is not None else None,
+        "max_rss_mb": round(max_rss_mb, 1) if max_rss_mb is not None else None,
+        "returncode": process.returncode,
+        "failed": process.returncode != 0,
+    }
+
+
+def rate(result: dict, count: int, digits: int) -> float:
+    # Throughput of a run, or None when the command failed: its timing says nothing about the tool
+    return None if result["failed"] else round(count / result["wall_s"], digits)
+
+
+def run_generator(name: str, args, work_dir: Path, server: MockTTSServer) -> dict:
+    # One generator end to end against the mock server, in a fresh folder
+    scenario_dir = work_dir / name
+    shutil.rmtree(scenario_dir, ignore_errors=True)
+    scenario_dir.mkdir(parents=True)
+    subtitles_file = scenario_dir / "subtitles.json"
+    if name == "phrases":
+        subtitles_file.write_text(json.dumps(subset_phrases(args.subtitles_file, args.max_phrases), ensure_ascii=False))
+        command = [sys.executable, str(REPO_DIR / "generate_audios_from_json.py")]
+    else:
+        subtitles_file.write_text(json.dumps(subset_phrases(args.spotter_subtitles_file, args.max_phrases)))
+        command = [sys.executable, str(REPO_DIR / "generate_spotter.py"), "--voice_name", "Bench"]
+    command += [
+        "--eleven_labs_api_key", "benchmark",
+        "--voice_id", "benchmark",
+        "--subtitles_file", str(subtitles_file),
+        "--api_base_url", server.url,
+        "--workers", str(args.workers),
+        "--output_format", args.output_format,
+    ] + shlex.split(args.generator_args)
+
+    requests_before = server.summary()
+    print(f"Running {name}: {' '.join(command[1:])}")
+    result = run_measured(command, scenario_dir, scenario_dir / "log.txt")
+    clips, chars = count_clips(scenario_dir)
+    served = server.summary()
+    result.update(
+        items=clips,
+        items_per_s=rate(result, clips, 2),
+        chars_per_s=rate(result, chars, 1),
+        server={key: served[key] - requests_before[key] for key in served},
+    )
+    return result
+
+
+def run_utils(args, work_dir: Path) -> dict:
+    # Every utils/ tool on the synthetic corpus; each tool's outputs are removed before it runs
+    utils_dir = work_dir / "utils"
+    corpus_dir = utils_dir / "voice"
+    utils_dir.mkdir(parents=True, exist_ok=True)
+    prepare_corpus(corpus_dir, subset_phrases(args.subtitles_file), args.corpus_files, args.corpus_rate, args.seed)
+    for entry in utils_dir.iterdir():
+        if entry not in (corpus_dir, utils_dir / "corpus.json"):
+            shutil.rmtree(entry) if entry.is_dir() else entry.unlink()
+
+    results = {}
+    for name, template in UTILS_BENCHMARKS:
+        command = [sys.executable, str(REPO_DIR / "utils" / template[0])]
+        command += [part.format(corpus=corpus_dir, work=utils_dir) for part in template[1:]]
+        print(f"Running {name}")
+        result = run_measured(command, utils_dir, utils_dir / f"{name}.log")
+        result.update(items=args.corpus_files, items_per_s=rate(result, args.corpus_files, 2))
+        results[f"utils/{name}"] = result
+    return results
+
+
+def git_commit() -> str:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        )
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args) -> list:
+    # Absolute, since every command runs with its scenario folder as working directory
+    work_dir = Path(args.work_dir).resolve()
+    work_dir.mkdir(parents=True, exist_ok=True)
+    run = time.strftime("%Y%m%d-%H%M%S")
+    settings = {
+        key: getattr(args, key)
+        for key in ("latency_ms", "jitter_ms", "error_rate", "audio_seconds", "workers", "output_format",
+                    "generator_args", "max_phrases", "corpus_files", "corpus_rate", "seed")
+    }
+    base = {"run": run, "label": args.label, "commit": git_commit(), "settings": settings}
+
+    results = {}
+    generators = [name for name in args.scenarios if name != "utils"]
+    if generators:
+        server = MockTTSServer(args.latency_ms, args.jitter_ms, args.error_rate, args.audio_seconds, args.seed)
+        server.start()
+        try:
+            for name in generators:
+                results[name] = run_generator(name, args, work_dir, server)
+        finally:
+            server.close()
+    if "utils" in args.scenarios:
+        results.update(run_utils(args, work_dir))
+
+    records = [dict(base, benchmark=name, **result) for name, result in results.items()]
+    with open(args.results_file, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return records
+
+
+def load_results(results_file: str) -> list:
+    with open(results_file, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def print_results(records: list) -> None:
+    print(f"{'benchmark':<26} {'items':>6} {'wall s':>8} {'items/s':>9} {'chars/s':>9} {'cpu s':>8} {'max RSS MB':>11} {'exit':>5}")
+    for record in records:
+        items_per_s = "FAILED" if record.get("failed") else record["items_per_s"]
+        print(
+            f"{record['benchmark']:<26} {record['items']:>6} {record['wall_s']:>8} {items_per_s:>9} "
+            f"{record.get('chars_per_s') or '-':>9} {record['cpu_s'] if record['cpu_s'] is not None else '-':>8} "
+            f"{record['max_rss_mb'] if record['max_rss_mb'] is not None else '-':>11} {record['returncode']:>5}"
+        )
+
+
+def compare_runs(records: list, base_run: str = None, new_run: str = None) -> None:
+    # Throughput and peak memory of two runs side by side (default: the last two in the file)
+    runs = list(dict.fromkeys(record["run"] for record in records))
+    if len(runs) < 2 and not (base_run and new_run):
+        print("Need at least two runs to compare.")
+        return
+    base_run = base_run or runs[-2]
+    new_run = new_run or runs[-1]
+    base = {record["benchmark"]: record for record in records if record["run"] == base_run}
+    new = {record["benchmark"]: record for record in records if record["run"] == new_run}
+    for run, results in ((base_run, base), (new_run, new)):
+        sample = next(iter(results.values()), {})
+        print(f"{run}: commit {sample.get('commit')}, label {sample.get('label')}")
+    if base and new and next(iter(base.values()))["settings"] != next(iter(new.values()))["settings"]:
+        print("Warning: the runs used different settings")
+
+    print(f"{'benchmark':<26} {'items/s':>9} {'->':>9} {'change':>8} {'max RSS MB':>11} {'->':>9} {'change':>8}")
+    for name in [name for name in new if name in base]:
+        if base[name].get("failed") or new[name].get("failed"):
+            failed = " and ".join(run for run, results in ((base_run, base), (new_run, new)) if results[name].get("failed"))
+            print(f"{name:<26} not compared, failed in {failed}")
+            continue
+        line = f"{name:<26}"
+        for key in ("items_per_s", "max_rss_mb"):
+            before, after = base[name][key], new[name][key]
+            change = f"{100 * (after - before) / before:+.1f}%" if before and after is not None else "-"
+            line += f" {before if before is not None else '-':>9} {after if after is not None else '-':>9} {change:>8}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the generators against a local mock TTS server and the utils/ tools on a synthetic corpus."
+    )
+    parser.add_argument("command", choices=["run", "compare", "serve"], help="Action to run")
+    parser.add_argument("--results_file", default=DEFAULT_RESULTS_FILE, help=f"JSONL results file (default: {DEFAULT_RESULTS_FILE})")
+    parser.add_argument("--work_dir", default=DEFAULT_WORK_DIR, help=f"Folder the benchmarks write into (default: {DEFAULT_WORK_DIR})")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS, help="Benchmarks to run (default: all)")
+    parser.add_argument("--label", help="Free text stored with the results, e.g. the change being measured")
+    parser.add_argument("--latency_ms", type=float, default=300, help="Mock server delay before each response (default: 300)")
+    parser.add_argument("--jitter_ms", type=float, default=200, help="Random extra delay of up to this much (default: 200)")
+    parser.add_argument("--error_rate", type=float, default=0.02, help="Share of requests answered with a 429 or 500 (default: 0.02)")
+    parser.add_argument("--audio_seconds", type=float, default=2.0, help="Length of the audio in each response (default: 2.0)")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the mock server (serve only, default: 8765)")
+    parser.add_argument("--workers", type=int, default=4, help="--workers passed to the generators (default: 4)")
+    parser.add_argument("--output_format", default="mp3_44100_128", help="--output_format passed to the generators")
+    parser.add_argument("--generator_args", default="", help="Extra options for the generators, e.g. \"--stream_decode --dedup off\"")
+    parser.add_argument("--subtitles_file", default=str(REPO_DIR / "data" / "voice_subtitles.json"), help="Phrases of the phrases benchmark and of the corpus")
+    parser.add_argument("--spotter_subtitles_file", default=str(REPO_DIR / "data" / "spotter_subtitles.json"), help="Phrases of the spotter benchmark")
+    parser.add_argument("--max_phrases", type=int, default=100, help="Phrases of the subtitles file synthesized (default: 100)")
+    parser.add_argument("--corpus_files", type=int, default=500, help="Clips in the synthetic corpus (default: 500)")
+    parser.add_argument("--corpus_rate", type=int, default=44100, help="Sample rate of the synthetic corpus (default: 44100)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the mock server and the corpus (default: 1)")
+    parser.add_argument("--base_run", help="Run to compare against (compare only, default: the second to last)")
+    parser.add_argument("--new_run", help="Run to compare (compare only, default: the last)")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        # Leave the mock server running, e.g. to point a generator at it with --api_base_url
+        server = MockTTSServer(args.latency_ms, args.jitter_ms, args.error_rate, args.audio_seconds, args.seed, args.port)
+        server.start()
+        print(f"Mock TTS server on {server.url}, Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.close()
+            print(f"Served {server.summary()}")
+        return
+
+    if args.command == "compare":
+        if not os.path.exists(args.results_file):
+            parser.error(f"File {args.results_file} not found.")
+        compare_runs(load_results(args.results_file), args.base_run, args.new_run)
+        return
+
+    records = run_benchmarks(args)
+    print_results(records)
+    print(f"Results appended to {args.results_file}")
+    failed = [record["benchmark"] for record in records if record["failed"]]
+    if failed:
+        print(f"Failed: {', '.join(failed)}; see the logs in {args.work_dir}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import os
+import sys
+import glob
+import json
+import argparse
+from dataclasses import replace
+from pathlib import Path
+from tts_engine import PackBuild, SynthesisConfig, add_engine_arguments, config_from_args, run_clips
+from generate_audios_from_json import load_phrases, pack_scope, plan_pack
+from generate_spotter import plan_spotter_pack, spotter_scope
+
+DEFAULT_PRIORITY_CATEGORIES = ["spotter", "radio_check"]
+
+
+def load_job_file(job_file: str) -> dict:
+    # {"priority_categories": [...], "jobs": [{"type": "phrases" | "spotter", "voice_id": ...,
+    #  "subtitles_file": ..., "output_root": ..., "voice_name": ..., "single_version": ...}, ...]}
+    if not os.path.exists(job_file):
+        raise FileNotFoundError(f"The file '{job_file}' does not exist.")
+    with open(job_file, "r") as f:
+        return json.load(f)
+
+
+def expand_jobs(jobs: list) -> list:
+    # One job per subtitles file: "subtitles_file" may be a glob such as "data/voice_subtitles_splitted_es/*.json"
+    expanded = []
+    for job in jobs:
+        subtitles_files = sorted(glob.glob(job["subtitles_file"]))
+        if not subtitles_files:
+            raise FileNotFoundError(f"No file matches '{job['subtitles_file']}'.")
+        expanded += [dict(job, subtitles_file=subtitles_file) for subtitles_file in subtitles_files]
+    return expanded
+
+
+def plan_build(config: SynthesisConfig, job: dict) -> PackBuild:
+    # The same folders, manifest and scope as running the matching generator script in output_root
+    phrases = load_phrases(job["subtitles_file"])
+    output_root = Path(job.get("output_root", "."))
+    single_version = job.get("single_version", False)
+    if job.get("type", "phrases") == "spotter":
+        base_dir = output_root / "voice"
+        phrase_jobs = plan_spotter_pack(job["voice_name"], phrases, single_version, base_dir)
+        scope = spotter_scope(config.voice_id, job["voice_name"], job["subtitles_file"])
+        return PackBuild(config, phrase_jobs, base_dir, scope)
+    phrase_jobs = plan_pack(phrases, single_version, output_root)
+    return PackBuild(config, phrase_jobs, output_root, pack_scope(config.voice_id, job["subtitles_file"]))
+
+
+def find_conflicts(jobs: list, builds: list) -> list:
+    # (clip path, job, other job) of every clip two jobs would write. Checked before any
+    # manifest is reconciled, since each job would prune or overwrite the other's clips.
+    owners = {}
+    conflicts = []
+    for index, (job, build) in enumerate(zip(jobs, builds)):
+        for clip_jobs in build.phrase_jobs.values():
+            for clip_job in clip_jobs:
+                path = os.path.abspath(build.manifest.root / build.manifest.relative_path(clip_job))
+                owner = owners.setdefault(path, index)
+                if owner != index:
+                    conflicts.append((path, job_name(jobs[owner]), job_name(job)))
+    return conflicts
+
+
+def job_name(job: dict) -> str:
+    return f"{job['subtitles_file']} (voice {job['voice_id']})"
+
+
+def is_priority(clip_job, priority_categories: list) -> bool:
+    # The category folder is "spotter" in a phrases pack and "spotter_<voice name>" in a spotter pack
+    category = clip_job.output_dir.parent.name
+    return any(category == name or category.startswith(f"{name}_") for name in priority_categories)
+
+
+def build_packs(config: SynthesisConfig, job_file: dict) -> int:
+    # Plan every job, then synthesize all their clips on one session, rate controller
+    # and decoder, latency-critical categories first
+    priority_categories = job_file.get("priority_categories", DEFAULT_PRIORITY_CATEGORIES)
+    jobs = expand_jobs(job_file["jobs"])
+    builds = []
+    clips = []
+    try:
+        job_configs = []
+        for job in jobs:
+            print(f"Planning {job['subtitles_file']} for voice {job['voice_id']} in {job.get('output_root', '.')}")
+            job_config = replace(config, voice_id=job["voice_id"])
+            builds.append(plan_build(job_config, job))
+            job_configs.append(job_config)
+        conflicts = find_conflicts(jobs, builds)
+        if conflicts:
+            for path, first, second in conflicts[:20]:
+                print(f"{path} is planned by both {first} and {second}")
+            raise SystemExit(f"{len(conflicts)} clips are planned by more than one job; give those jobs different output roots")
+
+        for build, job_config in zip(builds, job_configs):
+            clips += [(build, job_config, clip_job) for clip_job in build.prepare()]
+
+        clips.sort(key=lambda clip: not is_priority(clip[2], priority_categories))  # Stable: plan order otherwise
+        owner = {clip_job: build for build, _, clip_job in clips}
+        priority = sum(is_priority(clip_job, priority_categories) for _, _, clip_job in clips)
+        print(f"{len(clips)} clips from {len(builds)} jobs to synthesize, {priority} of them in priority categories")
+
+        def on_complete(clip_job, ok: bool) -> None:
+            owner[clip_job].on_complete(clip_job, ok)
+
+        run_clips(config, [(clip_config, clip_job) for _, clip_config, clip_job in clips], on_complete)
+        return sum(build.finish() for build in builds)
+    finally:
+        for build in builds:
+            build.close()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Generate several voice packs (voices, languages, subtitles files) in one process."
+    )
+    parser.add_argument(
+        "--eleven_labs_api_key", type=str, required=True, help="ElevenLabs API key"
+    )
+    parser.add_argument(
+        "--job_file",
+        type=str,
+        required=True,
+        help="JSON file listing the packs to generate",
+    )
+    add_engine_arguments(parser)
+    parser.set_defaults(voice_id=None)  # Every job names its own voice
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    failed = build_packs(config_from_args(args), load_job_file(args.job_file))
+    print(f"All jobs complete, {failed} clips failed" if failed else "All jobs complete")
+    sys.exit(1 if failed else 0)
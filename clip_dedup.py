@@ -0,0 +1,100 @@
+import os
+import shutil
+
+DEDUP_MODES = ["link", "copy", "off"]
+
+
+def clip_wav_path(job) -> str:
+    return f"{job.output_dir}/{job.output_filename}.wav"
+
+
+class ClipDeduplicator:
+    # Groups the clips of a pack by what is sent to the API (key(job), e.g. text and take).
+    # Only the first clip of each group is synthesized; the others are materialized from
+    # its WAV as hardlinks ("link") or copies ("copy") once it has been written.
+    def __init__(self, mode: str, key):
+        self.mode = mode
+        self.key = key
+        self.followers = {}  # Synthesized job -> pending jobs waiting for its WAV
+        self.calls_saved = 0
+        self.audio_bytes_saved = 0  # Size of the WAVs that did not have to be synthesized
+        self.disk_bytes_saved = 0  # Size of the WAVs stored as hardlinks instead of copies
+
+    def plan(self, jobs: list, pending: list) -> tuple:
+        # Split the pending jobs into (to_synthesize, ready). Pending clips sharing their
+        # key with a clip already on disk are materialized right away and returned in ready;
+        # the other duplicates wait in followers for the first clip of their group.
+        self.detach(pending)
+        if self.mode == "off":
+            return pending, []
+
+        pending_set = set(pending)
+        existing = {}
+        for job in jobs:
+            if job not in pending_set:
+                existing.setdefault(self.key(job), job)
+
+        leaders = {}
+        to_synthesize = []
+        ready = []
+        for job in pending:
+            key = self.key(job)
+            if key in existing and self.materialize(existing[key], job):
+                ready.append(job)
+            elif key in leaders:
+                self.followers[leaders[key]].append(job)
+            else:
+                leaders[key] = job
+                self.followers[job] = []
+                to_synthesize.append(job)
+
+        duplicates = len(pending) - len(to_synthesize)
+        if duplicates:
+            print(f"Deduplication: {len(to_synthesize)} unique clips to synthesize, {duplicates} shared with another clip")
+        return to_synthesize, ready
+
+    def detach(self, pending: list) -> None:
+        # A clip about to be synthesized again may be hardlinked to other clips by an earlier
+        # run; ffmpeg and the silence trimming write in place, so drop this name first
+        for job in pending:
+            path = clip_wav_path(job)
+            try:
+                if os.stat(path).st_nlink > 1:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def materialize(self, source_job, job) -> bool:
+        # Give job the WAV of source_job; True once its file is in place
+        source = clip_wav_path(source_job)
+        target = clip_wav_path(job)
+        part_file = f"{target}.part"
+        linked = False
+        try:
+            if os.path.lexists(part_file):
+                os.unlink(part_file)
+            if self.mode == "link":
+                try:
+                    os.link(source, part_file)
+                    linked = True
+                except OSError:
+                    shutil.copyfile(source, part_file)  # File system without hardlinks
+            else:
+                shutil.copyfile(source, part_file)
+            os.replace(part_file, target)
+            size = os.path.getsize(target)
+        except OSError as e:
+            print(f"Could not reuse {source} for {target}: {e}")
+            return False
+
+        self.calls_saved += 1
+        self.audio_bytes_saved += size
+        if linked:
+            self.disk_bytes_saved += size
+        return True
+
+    def summary(self) -> str:
+        return (
+            f"{self.calls_saved} API calls saved ({self.audio_bytes_saved / 1024 / 1024:.1f} MB of audio), "
+            f"{self.disk_bytes_saved / 1024 / 1024:.1f} MB of disk saved by hardlinks"
+        )
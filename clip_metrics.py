@@ -0,0 +1,152 @@
+import os
+import json
+import math
+import time
+import argparse
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+# Per-clip timings, all in seconds:
+#   wait_s    submission until the first request is sent (worker pool and rate controller)
+#   ttfb_s    request sent until the first byte of the response body
+#   http_s    request sent until the last byte, for the attempt that succeeded
+#   write_s   time spent writing the response to disk or into the streaming decoder
+#   decode_s  response complete until the WAV is written (includes batching in the decoder)
+#   post_s    silence trimming / level normalization
+#   total_s   submission until the clip is done
+TIMINGS = ["wait_s", "ttfb_s", "http_s", "write_s", "decode_s", "post_s", "total_s"]
+
+
+def clip_record(job) -> dict:
+    # Started when the clip is submitted; keys starting with "_" are not written out
+    return {
+        "path": f"{job.output_dir}/{job.output_filename}.wav",
+        "category": Path(job.output_dir).parent.name,
+        "chars": len(job.text),
+        "take": job.take,
+        "started": time.time(),
+        "_submitted": time.perf_counter(),
+    }
+
+
+class MetricsSink:
+    # Appends one JSON line per clip to a file shared by every worker; each run gets an id
+    # so several runs can be kept in the same file and compared
+    def __init__(self, path: str):
+        self.run = time.strftime("%Y%m%d-%H%M%S")
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: dict) -> None:
+        record = {
+            key: round(value, 4) if key.endswith("_s") else value
+            for key, value in record.items()
+            if not key.startswith("_")
+        }
+        record["run"] = self.run
+        record["finished"] = time.time()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def load_records(path: str, run: str = None) -> list:
+    # Records of the given run, of the last run in the file if run is None, or of every run if run is "all"
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    if run is None and records:
+        run = records[-1]["run"]
+    return records if run == "all" else [record for record in records if record["run"] == run]
+
+
+def percentile(values: list, fraction: float) -> float:
+    # Nearest-rank percentile
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def run_span(records: list) -> float:
+    return max(record["finished"] for record in records) - min(record["started"] for record in records)
+
+
+def summarize(records: list) -> dict:
+    # {category: {"clips", "failed", "clips_per_s", "chars_per_s", "<timing>_p50", "<timing>_p95"}},
+    # plus "all" for the whole run. Rates are over the wall time the category's clips spanned
+    # in each run, so summarizing several runs does not count the time between them.
+    groups = defaultdict(list)
+    for record in records:
+        groups[record["category"]].append(record)
+        groups["all"].append(record)
+
+    summary = {}
+    for category, group in sorted(groups.items(), key=lambda item: (item[0] == "all", item[0])):
+        runs = {record["run"] for record in group}
+        span = sum(run_span([record for record in group if record["run"] == run]) for run in runs)
+        done = [record for record in group if record.get("ok")]
+        stats = {
+            "clips": len(group),
+            "failed": len(group) - len(done),
+            "cached": sum(1 for record in group if record.get("cached")),
+            "clips_per_s": round(len(done) / span, 2) if span > 0 else None,
+            "chars_per_s": round(sum(record["chars"] for record in done) / span, 1) if span > 0 else None,
+        }
+        for timing in TIMINGS:
+            values = [record[timing] for record in done if record.get(timing) is not None]
+            stats[f"{timing}_p50"] = percentile(values, 0.5)
+            stats[f"{timing}_p95"] = percentile(values, 0.95)
+        summary[category] = stats
+    return summary
+
+
+def format_seconds(value: float) -> str:
+    return "-" if value is None else f"{value:.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the per-clip timings written with --metrics_file.")
+    parser.add_argument("command", choices=["summary"], help="Action to run")
+    parser.add_argument("--metrics_file", type=str, required=True, help="JSONL file written with --metrics_file")
+    parser.add_argument("--run", type=str, help="Run id to summarize, or 'all' (default: the last run in the file)")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.metrics_file):
+        print(f"File {args.metrics_file} not found.")
+        return
+    records = load_records(args.metrics_file, args.run)
+    if not records:
+        print("No records found.")
+        return
+    summary = summarize(records)
+    if args.json:
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+        return
+
+    print(f"Run {records[-1]['run'] if args.run != 'all' else 'all'}: {len(records)} clips")
+    header = f"{'category':<28} {'clips':>6} {'failed':>6} {'clips/s':>8} {'chars/s':>8}"
+    header += "".join(f" {timing[:-2] + ' p50/p95':>18}" for timing in TIMINGS)
+    print(header)
+    for category, stats in summary.items():
+        line = f"{category[:28]:<28} {stats['clips']:>6} {stats['failed']:>6} "
+        line += f"{stats['clips_per_s'] if stats['clips_per_s'] is not None else '-':>8} "
+        line += f"{stats['chars_per_s'] if stats['chars_per_s'] is not None else '-':>8}"
+        for timing in TIMINGS:
+            pair = f"{format_seconds(stats[f'{timing}_p50'])}/{format_seconds(stats[f'{timing}_p95'])}"
+            line += f" {pair:>18}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
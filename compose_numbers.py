@@ -0,0 +1,286 @@
+import os
+import re
+import json
+import sys
+import argparse
+import unicodedata
+from dataclasses import replace
+from pathlib import Path
+from tts_engine import (
+    ClipJob,
+    PhraseCsvWriter,
+    SynthesisConfig,
+    add_engine_arguments,
+    config_from_args,
+    run_jobs,
+)
+from utils.audio_dsp import crossfade_concat, read_wav, write_wav
+
+# Spanish numerals as read in data/voice_subtitles_splitted_es/numbers*.json
+NUMBER_WORDS = [
+    "cero", "uno", "dos", "tres", "cuatro", "cinco", "seis", "siete", "ocho", "nueve",
+    "diez", "once", "doce", "trece", "catorce", "quince", "dieciséis", "diecisiete", "dieciocho", "diecinueve",
+    "veinte", "veintiuno", "veintidós", "veintitrés", "veinticuatro", "veinticinco", "veintiséis", "veintisiete",
+    "veintiocho", "veintinueve",
+]
+TENS_WORDS = ["", "", "", "treinta", "cuarenta", "cincuenta", "sesenta", "setenta", "ochenta", "noventa"]
+POINT_WORD = "punto"
+UNIT_WORDS = {"seconds": "segundos", "minutes": "minutos"}
+
+FRAGMENTS_FOLDER = "number_fragments"
+FRAGMENT_PADDING_MS = 10  # Silence kept around each fragment after trimming
+DEFAULT_CROSSFADE_MS = 15
+DEFAULT_WORD_GAP_MS = 0
+DEFAULT_PAUSE_MS = 200  # Silence in place of a comma, e.g. between minutes and seconds
+
+KEY_PATTERN = re.compile(r"(?:(\d+)_(\d\d)|(\d+)?(?:point(\d+))?)(seconds|minutes)?")
+
+
+def spell_number(n: int) -> str:
+    if n < len(NUMBER_WORDS):
+        return NUMBER_WORDS[n]
+    tens, units = divmod(n, 10)
+    return TENS_WORDS[tens] + (f" y {NUMBER_WORDS[units]}" if units else "")
+
+
+def spell_digits(digits: str) -> str:
+    # "07" is read digit by digit ("cero siete"), "7" and "42" as numbers; None past 99
+    if len(digits) > 1 and digits[0] == "0":
+        return " ".join(NUMBER_WORDS[int(digit)] for digit in digits)
+    return spell_number(int(digits)) if int(digits) < 100 else None
+
+
+def spell_key(phrase_key: str) -> str:
+    # Text of a number phrase key such as "15point6", "2_58", "point05" or "1point5seconds",
+    # or None when the key is not a number
+    match = KEY_PATTERN.fullmatch(phrase_key)
+    if match is None:
+        return None
+    minutes, seconds, whole, decimals, unit = match.groups()
+    if minutes is not None:
+        parts = [spell_digits(minutes), ",", spell_digits(seconds)]
+    elif whole is not None or decimals is not None:
+        parts = [spell_digits(whole)] if whole is not None else []
+        if decimals is not None:
+            parts += [POINT_WORD, spell_digits(decimals)]
+    else:
+        return None
+    if None in parts:
+        return None
+    if unit:
+        parts.append(UNIT_WORDS[unit])
+    return " ".join(parts).replace(" ,", ",")
+
+
+def number_vocabulary(whole_numbers: bool) -> set:
+    # Fragments a number clip is assembled from: single words by default,
+    # or every number up to 99 as one fragment for smoother compound numbers
+    vocabulary = {POINT_WORD, *UNIT_WORDS.values(), *NUMBER_WORDS, *TENS_WORDS[3:], "y"}
+    if whole_numbers:
+        vocabulary |= {spell_number(n) for n in range(100)}
+    return vocabulary
+
+
+def split_fragments(text: str, vocabulary: set) -> list:
+    # Fragments of text, longest match first, with None where a comma asks for a pause.
+    # Returns None if a word is not in the vocabulary.
+    fragments = []
+    for group_index, group in enumerate(text.split(",")):
+        if group_index:
+            fragments.append(None)
+        words = group.lower().split()
+        i = 0
+        while i < len(words):
+            for length in range(min(3, len(words) - i), 0, -1):
+                fragment = " ".join(words[i:i + length])
+                if fragment in vocabulary:
+                    fragments.append(fragment)
+                    i += length
+                    break
+            else:
+                return None
+    return fragments
+
+
+def fragment_filename(fragment: str) -> str:
+    ascii_name = unicodedata.normalize("NFKD", fragment).encode("ascii", "ignore").decode("ascii")
+    return ascii_name.replace(" ", "_")
+
+
+def plan_compositions(phrases: dict, vocabulary: set) -> tuple:
+    # ([(phrase_dir, phrase_key, text, fragments), ...], [keys that cannot be composed])
+    compositions = []
+    skipped = []
+    for category, phrases_list in phrases.items():
+        for phrase_key, variants in phrases_list.items():
+            text = next((variant for variant in variants if variant.strip()), None) or spell_key(phrase_key)
+            fragments = split_fragments(text, vocabulary) if text else None
+            if not fragments:
+                skipped.append(f"{category}/{phrase_key}")
+                continue
+            compositions.append((Path(category) / phrase_key, phrase_key, text, fragments))
+    return compositions, skipped
+
+
+def synthesize_fragments(config: SynthesisConfig, fragments: set, fragments_dir: Path) -> int:
+    # Every fragment is synthesized once and trimmed tight, so joins do not leave gaps
+    fragments_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [
+        ClipJob(fragment, fragments_dir, fragment_filename(fragment))
+        for fragment in sorted(fragments)
+        if not (fragments_dir / f"{fragment_filename(fragment)}.wav").exists()
+    ]
+    print(f"Fragments: {len(fragments) - len(jobs)} already synthesized, {len(jobs)} to synthesize")
+    if not jobs:
+        return 0
+    fragment_config = replace(config, trim_silence=True, trim_padding_ms=FRAGMENT_PADDING_MS, normalize_dbfs=None)
+    return run_jobs(fragment_config, jobs)
+
+
+def default_fragments_dir(config: SynthesisConfig, output_folder: Path) -> Path:
+    # Outside the pack, so the fragments are never shipped with it: in the response cache
+    # if there is one, else next to the output folder. One folder per voice and format.
+    output_folder = output_folder.resolve()
+    if config.cache_dir:
+        base = Path(config.cache_dir) / FRAGMENTS_FOLDER
+    else:
+        base = output_folder.parent / f"{output_folder.name}_{FRAGMENTS_FOLDER}"
+    return base / f"{config.voice_id}_{config.output_format}"
+
+
+def compose_numbers(
+    config: SynthesisConfig,
+    phrases: dict,
+    output_folder: Path,
+    fragments_dir: Path,
+    whole_numbers: bool,
+    crossfade_ms: float,
+    word_gap_ms: float,
+    pause_ms: float,
+) -> int:
+    # Returns the number of fragments that could not be synthesized
+    compositions, skipped = plan_compositions(phrases, number_vocabulary(whole_numbers))
+    if not compositions:
+        print("No number phrases to compose in the given files")
+        if skipped:
+            print(f"{len(skipped)} phrases are not numbers and were skipped: {', '.join(skipped)}")
+        return 0
+    fragments = {fragment for _, _, _, clip_fragments in compositions for fragment in clip_fragments if fragment}
+    print(f"Fragments are kept in {fragments_dir}")
+    failed = synthesize_fragments(config, fragments, fragments_dir)
+    if failed:
+        print("Some fragments could not be synthesized, rerun to retry them")
+        return failed
+
+    audio = {}
+    for fragment in fragments:
+        audio[fragment] = read_wav(str(fragments_dir / f"{fragment_filename(fragment)}.wav"))
+    sample_rate, sample_width = next(iter(audio.values()))[1:]
+    crossfade = int(sample_rate * crossfade_ms / 1000)
+    word_gap = int(sample_rate * word_gap_ms / 1000)
+    pause = int(sample_rate * pause_ms / 1000)
+
+    # Each clip is its fragments joined in memory, written as the pack's <key>_1.wav
+    csv_writer = PhraseCsvWriter()
+    for phrase_dir, phrase_key, text, clip_fragments in compositions:
+        pieces = []
+        gaps = []
+        for fragment in clip_fragments:
+            if fragment is None:
+                if gaps:
+                    gaps[-1] = pause
+                continue
+            pieces.append(audio[fragment][0])
+            gaps.append(word_gap)
+        phrase_dir = output_folder / phrase_dir
+        phrase_dir.mkdir(parents=True, exist_ok=True)
+        job = ClipJob(text, phrase_dir, f"{phrase_key}_1")
+        write_wav(f"{phrase_dir}/{job.output_filename}.wav", crossfade_concat(pieces, gaps, crossfade), sample_rate, sample_width)
+        csv_writer.add_phrase(phrase_dir, [job], 0)
+
+    print(f"Composed {len(compositions)} clips from {len(fragments)} synthesized fragments")
+    if skipped:
+        print(f"{len(skipped)} phrases are not numbers and were skipped: {', '.join(skipped)}")
+    return 0
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Compose number clips from a few synthesized fragments instead of synthesizing every numeral."
+    )
+    parser.add_argument(
+        "--eleven_labs_api_key", type=str, required=True, help="ElevenLabs API key"
+    )
+    parser.add_argument(
+        "--voice_id",
+        type=str,
+        required=True,
+        help="ID of the voice from the ElevenLabs 'Voices' page",
+    )
+    parser.add_argument(
+        "--subtitles_files",
+        type=str,
+        nargs="+",
+        required=True,
+        help="JSON files with the number phrases, e.g. data/voice_subtitles_splitted_es/numbers*.json",
+    )
+    parser.add_argument(
+        "--output_folder", type=str, default=".", help="Folder the number categories are written to (default: .)"
+    )
+    parser.add_argument(
+        "--fragments_dir",
+        type=str,
+        help="Folder the synthesized fragments are kept in between runs (default: number_fragments/ in --cache_dir, "
+        "or <output_folder>_number_fragments next to the output folder)",
+    )
+    parser.add_argument(
+        "--whole_numbers",
+        action="store_true",
+        help="If provided, every number up to 99 is synthesized as one fragment instead of word by word",
+    )
+    parser.add_argument(
+        "--crossfade_ms",
+        type=float,
+        default=DEFAULT_CROSSFADE_MS,
+        help=f"Crossfade between joined fragments (default: {DEFAULT_CROSSFADE_MS})",
+    )
+    parser.add_argument(
+        "--word_gap_ms",
+        type=float,
+        default=DEFAULT_WORD_GAP_MS,
+        help=f"Silence between words; 0 crossfades them (default: {DEFAULT_WORD_GAP_MS})",
+    )
+    parser.add_argument(
+        "--pause_ms",
+        type=float,
+        default=DEFAULT_PAUSE_MS,
+        help=f"Silence in place of a comma, e.g. in minutes and seconds (default: {DEFAULT_PAUSE_MS})",
+    )
+    add_engine_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if args.shard:
+        raise SystemExit("--shard is not supported, the few fragments are synthesized on one machine")
+    phrases = {}
+    for subtitles_file in args.subtitles_files:
+        if not os.path.exists(subtitles_file):
+            raise FileNotFoundError(f"The file '{subtitles_file}' does not exist.")
+        with open(subtitles_file, "r") as f:
+            for category, phrases_list in json.load(f).items():
+                phrases.setdefault(category, {}).update(phrases_list)
+    config = config_from_args(args)
+    output_folder = Path(args.output_folder)
+    failed = compose_numbers(
+        config,
+        phrases,
+        output_folder,
+        Path(args.fragments_dir) if args.fragments_dir else default_fragments_dir(config, output_folder),
+        args.whole_numbers,
+        args.crossfade_ms,
+        args.word_gap_ms,
+        args.pause_ms,
+    )
+    sys.exit(1 if failed else 0)
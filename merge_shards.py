@@ -0,0 +1,124 @@
+import os
+import csv
+import sys
+import shutil
+import filecmp
+import argparse
+from pathlib import Path
+from pack_manifest import MANIFEST_FILENAME, read_manifest, write_manifest
+
+TEMPORARY_SUFFIXES = (".part", ".tmp", ".reuse")
+
+
+def merge_shards(shard_folders: list, output_folder: str) -> list:
+    # Copy the trees built with --shard 1/N ... N/N into output_folder and merge their
+    # manifests. Returns the files that two shards wrote with different contents.
+    output = Path(output_folder)
+    manifests = {}  # Folder relative to the pack -> merged manifest entries
+    conflicts = []
+    copied = 0
+    linked = 0
+
+    for shard in shard_folders:
+        links = {}  # (device, inode) -> first output path, so deduplicated clips stay hardlinked
+        for root, dirs, files in os.walk(shard):
+            relative = Path(root).relative_to(shard)
+            (output / relative).mkdir(parents=True, exist_ok=True)
+            for filename in sorted(files):
+                source = Path(root) / filename
+                target = output / relative / filename
+                if filename == MANIFEST_FILENAME:
+                    if relative not in manifests:
+                        manifests[relative] = read_manifest(target)
+                    manifests[relative].update(read_manifest(source))
+                    continue
+                if filename.endswith(TEMPORARY_SUFFIXES):
+                    continue
+                if target.exists():
+                    # subtitles.csv files come from the full plan and are the same in every shard
+                    if not filecmp.cmp(source, target, shallow=False):
+                        conflicts.append((relative / filename).as_posix())
+                    continue
+
+                stat = source.stat()
+                inode = (stat.st_dev, stat.st_ino)
+                if stat.st_nlink > 1 and inode in links:
+                    os.link(links[inode], target)
+                    linked += 1
+                else:
+                    shutil.copy2(source, target)
+                    links[inode] = target
+                    copied += 1
+
+    for relative, entries in manifests.items():
+        write_manifest(output / relative / MANIFEST_FILENAME, dict(sorted(entries.items())))
+    print(f"Merged {len(shard_folders)} shards into {output}: {copied} files copied, {linked} hardlinked")
+    for conflict in conflicts:
+        print(f"Conflict: {conflict} differs between shards")
+    return conflicts
+
+
+def verify_pack(pack_folder: str) -> list:
+    # Check that every clip listed in a subtitles.csv or a manifest is there (with the size
+    # the manifest recorded), and that no clip is missing from its folder's subtitles.csv
+    pack = Path(pack_folder)
+    problems = []
+    clips = 0
+    for root, dirs, files in os.walk(pack):
+        root = Path(root)
+        if "subtitles.csv" in files:
+            with open(root / "subtitles.csv", newline="") as csvfile:
+                listed = {row[0] for row in csv.reader(csvfile) if row}
+            clips += len(listed)
+            for filename in sorted(listed):
+                if filename not in files:
+                    problems.append(f"Missing: {(root / filename).relative_to(pack).as_posix()}")
+            for filename in sorted(files):
+                if filename.endswith(".wav") and filename not in listed:
+                    problems.append(f"Not in subtitles.csv: {(root / filename).relative_to(pack).as_posix()}")
+        if MANIFEST_FILENAME in files:
+            for rel, entry in read_manifest(root / MANIFEST_FILENAME).items():
+                try:
+                    size = os.path.getsize(root / rel)
+                except OSError:
+                    size = None
+                if size != entry["size"]:
+                    problems.append(f"Manifest entry without its clip: {(root / rel).relative_to(pack).as_posix()}")
+        for filename in sorted(files):
+            if filename.endswith(TEMPORARY_SUFFIXES):
+                problems.append(f"Unfinished file: {(root / filename).relative_to(pack).as_posix()}")
+
+    for problem in problems:
+        print(problem)
+    print(f"Verified {clips} clips in {pack}: {len(problems)} problems")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge the folders of a voice pack built with --shard i/N, or verify a pack."
+    )
+    parser.add_argument("command", choices=["merge", "verify"], help="Action to run")
+    parser.add_argument(
+        "folders", nargs="+", help="Shard folders to merge, or the pack folder to verify"
+    )
+    parser.add_argument("--output_folder", type=str, help="Folder the shards are merged into (merge only)")
+    args = parser.parse_args()
+
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            parser.error(f"Folder {folder} not found.")
+
+    if args.command == "merge":
+        if not args.output_folder:
+            parser.error("merge needs --output_folder")
+        conflicts = merge_shards(args.folders, args.output_folder)
+        problems = verify_pack(args.output_folder)
+        sys.exit(1 if conflicts or problems else 0)
+    else:
+        problems = [problem for folder in args.folders for problem in verify_pack(folder)]
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import os
+import queue
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import Future
+from pathlib import Path
+
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_BATCH_WAIT = 0.25  # Seconds a batch waits for more files before it is decoded
+
+
+def convert_mp3_to_wav(input_file: str, output_file: str) -> bool:
+    ffmpeg_command = ["ffmpeg", "-y", "-loglevel", "error", "-i", input_file, output_file]
+
+    try:
+        subprocess.run(ffmpeg_command, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"An error occurred during conversion: {e}")
+        return False
+    return True
+
+
+def convert_batch(files: list) -> list:
+    # Convert [(input_file, output_file), ...] with a single ffmpeg process.
+    # Every output maps only its own input's audio and metadata, so each WAV is
+    # byte-identical to what a separate `ffmpeg -i input output` would write.
+    ffmpeg_command = ["ffmpeg", "-y", "-loglevel", "error"]
+    for input_file, _ in files:
+        ffmpeg_command += ["-i", input_file]
+    for index, (_, output_file) in enumerate(files):
+        ffmpeg_command += ["-map", f"{index}:a", "-map_metadata", str(index), output_file]
+
+    try:
+        subprocess.run(ffmpeg_command, check=True)
+    except subprocess.CalledProcessError:
+        # One bad file fails the whole batch; convert one by one to find it
+        return [convert_mp3_to_wav(input_file, output_file) for input_file, output_file in files]
+    return [True] * len(files)
+
+
+class BatchDecoder:
+    # Collects MP3 files from the synthesis workers and converts them in batches
+    # on a background thread, instead of spawning one ffmpeg process per clip
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, max_wait: float = DEFAULT_BATCH_WAIT):
+        self.batch_size = max(batch_size, 1)
+        self.max_wait = max_wait
+        self.batches = 0
+        self.files = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, input_file: str, output_file: str, remove_input: bool = False) -> Future:
+        # The returned future resolves to True once output_file has been written
+        future = Future()
+        self._queue.put((input_file, output_file, remove_input, future))
+        return future
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            self._decode(batch)
+
+    def _decode(self, batch: list) -> None:
+        try:
+            if len(batch) == 1:
+                results = [convert_mp3_to_wav(batch[0][0], batch[0][1])]
+            else:
+                results = convert_batch([(input_file, output_file) for input_file, output_file, _, _ in batch])
+            self.batches += 1
+            self.files += len(batch)
+            for (input_file, _, remove_input, future), ok in zip(batch, results):
+                if remove_input:
+                    Path(input_file).unlink()
+                future.set_result(ok)
+        except Exception as e:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+# Sample rates by MPEG version bits (2.5, reserved, 2, 1) and sample rate index
+MPEG_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+FORMAT_PROBE_LIMIT = 64 * 1024  # Give up looking for a frame header after this many bytes
+INFO_TAG_BYTES = 200  # The Xing/Info and LAME tags fit in this many bytes after the side information
+
+
+def parse_mp3_format(data: bytes) -> tuple:
+    # (sample_rate, channels, total_samples) from the start of an MP3 stream, or None if
+    # data does not contain the first frame and its tags yet. total_samples comes from the
+    # Xing/LAME tags (frames * samples per frame - encoder delay - padding) and is None
+    # when the stream has no such tags.
+    offset = 0
+    if data[:3] == b"ID3":
+        if len(data) < 10:
+            return None
+        size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+        offset = 10 + size + (10 if data[5] & 0x10 else 0)
+    for i in range(offset, len(data) - 3):
+        if data[i] != 0xFF or data[i + 1] & 0xE0 != 0xE0:
+            continue
+        version = (data[i + 1] >> 3) & 0x03
+        layer = (data[i + 1] >> 1) & 0x03
+        rate_index = (data[i + 2] >> 2) & 0x03
+        if version == 1 or layer == 0 or rate_index == 3:
+            continue
+        channels = 1 if data[i + 3] >> 6 == 3 else 2
+        if layer != 1:  # Gapless tags are only read for Layer III
+            return MPEG_SAMPLE_RATES[version][rate_index], channels, None
+
+        side_info = (17 if channels == 1 else 32) if version == 3 else (9 if channels == 1 else 17)
+        tag = i + 4 + side_info
+        if len(data) < tag + INFO_TAG_BYTES:
+            return None
+        return MPEG_SAMPLE_RATES[version][rate_index], channels, parse_gapless_samples(data, tag, version)
+    return None
+
+
+def parse_gapless_samples(data: bytes, tag: int, version: int) -> int:
+    if data[tag:tag + 4] not in (b"Xing", b"Info"):
+        return None
+    flags = int.from_bytes(data[tag + 4:tag + 8], "big")
+    if not flags & 0x01:
+        return None
+    frames = int.from_bytes(data[tag + 8:tag + 12], "big")
+    lame = tag + 8 + 4 + (4 if flags & 0x02 else 0) + (100 if flags & 0x04 else 0) + (4 if flags & 0x08 else 0)
+    samples_per_frame = 1152 if version == 3 else 576
+    delay_padding = data[lame + 21:lame + 24]
+    if len(delay_padding) < 3:
+        return frames * samples_per_frame
+    delay = delay_padding[0] << 4 | delay_padding[1] >> 4
+    padding = (delay_padding[1] & 0x0F) << 8 | delay_padding[2]
+    return frames * samples_per_frame - delay - padding
+
+
+class StreamingWavWriter:
+    # Decodes an MP3 byte stream with ffmpeg while it is still being downloaded and
+    # writes the PCM straight into output_file. Data goes to a .part file that is
+    # renamed over output_file only once the whole clip has been decoded.
+    def __init__(self, output_file: str):
+        self.output_file = output_file
+        self.part_file = f"{output_file}.part"
+        self._probe = bytearray()
+        self._process = None
+        self._reader = None
+        self._frames = 0
+        self._error = None
+
+    def write(self, chunk: bytes) -> None:
+        if self._process is None:
+            self._probe += chunk
+            audio_format = parse_mp3_format(self._probe)
+            if audio_format is None and len(self._probe) < FORMAT_PROBE_LIMIT:
+                return
+            self._start(*(audio_format or (44100, 1, None)))
+            chunk = bytes(self._probe)
+        self._process.stdin.write(chunk)
+
+    def _start(self, sample_rate: int, channels: int, total_samples: int) -> None:
+        # Decode to raw 16-bit PCM at the MP3's own rate and channel count, the
+        # same samples a plain `ffmpeg -i input.mp3 output.wav` would produce.
+        # ffmpeg cannot drop the end padding of a stream it cannot seek in, so the
+        # reader stops at the sample count announced in the LAME tag instead.
+        ffmpeg_command = [
+            "ffmpeg", "-loglevel", "error", "-i", "pipe:0",
+            "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-ac", str(channels), "pipe:1",
+        ]
+        self._process = subprocess.Popen(ffmpeg_command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self._reader = threading.Thread(target=self._read_pcm, args=(sample_rate, channels, total_samples), daemon=True)
+        self._reader.start()
+
+    def _read_pcm(self, sample_rate: int, channels: int, total_samples: int) -> None:
+        frame_size = 2 * channels
+        try:
+            with wave.open(self.part_file, "wb") as wav_file:
+                wav_file.setnchannels(channels)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(sample_rate)
+                while True:
+                    pcm = self._process.stdout.read(64 * 1024)
+                    if not pcm:
+                        break
+                    if total_samples is not None:
+                        pcm = pcm[:max(total_samples - self._frames, 0) * frame_size]
+                    wav_file.writeframes(pcm)
+                    self._frames += len(pcm) // frame_size
+        except OSError as e:
+            self._error = e
+
+    def close(self) -> bool:
+        # Finish decoding; True once output_file is complete
+        if self._process is None:
+            if not self._probe:
+                return False
+            self._start(*(parse_mp3_format(self._probe) or (44100, 1, None)))
+            self._process.stdin.write(bytes(self._probe))
+        self._process.stdin.close()
+        self._reader.join()
+        returncode = self._process.wait()
+        if returncode != 0 or self._error is not None or self._frames == 0:
+            print(f"An error occurred during conversion of {self.output_file}: {self._error or returncode}")
+            self._remove_part()
+            return False
+        os.replace(self.part_file, self.output_file)
+        return True
+
+    def abort(self) -> None:
+        # Drop a clip whose download failed halfway
+        if self._process is not None:
+            self._process.kill()
+            self._reader.join()
+            self._process.wait()
+        self._remove_part()
+
+    def _remove_part(self) -> None:
+        try:
+            os.unlink(self.part_file)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,172 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+MANIFEST_FILENAME = ".voicepack_manifest.jsonl"
+
+
+def read_manifest(path: Path) -> dict:
+    # Replay a manifest journal into {path relative to its folder: entry}
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Torn last line after a crash
+            if entry.get("removed"):
+                entries.pop(entry["path"], None)
+            else:
+                entries[entry["path"]] = entry
+    return entries
+
+
+def write_manifest(path: Path, entries: dict) -> None:
+    # Write one line per clip, replacing the file atomically
+    tmp_path = Path(path).with_name(Path(path).name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for entry in entries.values():
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class PackManifest:
+    # Journal of the clips already generated in a pack, one JSON line per finished clip.
+    # Lines are appended (and fsynced) as clips land, so a crash loses at most the clip
+    # being written; compact() rewrites the journal atomically at the end of a run.
+    #
+    # scope identifies the subtitles file (and voice) a clip was planned from, so that
+    # pruning never touches clips that belong to another subtitles file in the same pack.
+    def __init__(self, root: Path, scope: str, voice_id: str, model_id: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.path = self.root / MANIFEST_FILENAME
+        self.scope = scope
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.entries = {}  # Path relative to root -> entry
+        self._load()
+        self._journal = open(self.path, "a", encoding="utf-8")
+
+    def _load(self) -> None:
+        self.entries = read_manifest(self.path)
+
+    def _append(self, entry: dict) -> None:
+        self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def relative_path(self, job) -> str:
+        return Path(os.path.relpath(job.output_dir / f"{job.output_filename}.wav", self.root)).as_posix()
+
+    def _is_valid(self, rel: str, entry: dict) -> bool:
+        # A clip is valid while its file is still there with the size recorded when it landed
+        try:
+            return os.path.getsize(self.root / rel) == entry["size"]
+        except OSError:
+            return False
+
+    def _same_voice(self, entry: dict) -> bool:
+        return entry["voice_id"] == self.voice_id and entry["model_id"] == self.model_id
+
+    def reconcile(self, jobs: list) -> list:
+        # Skip clips that already exist, reuse clips whose variant moved to another index,
+        # prune clips this scope no longer plans and return the jobs left to synthesize
+        planned = {self.relative_path(job): job for job in jobs}
+
+        by_content = {}
+        for rel, entry in self.entries.items():
+            if self._same_voice(entry) and self._is_valid(rel, entry):
+                key = (str(Path(rel).parent), entry["text"], entry["take"])
+                by_content.setdefault(key, rel)
+
+        pending = []
+        reuse = []
+        for rel, job in planned.items():
+            entry = self.entries.get(rel)
+            if entry is not None and self._same_voice(entry) and self._is_valid(rel, entry) and (
+                entry["text"] == job.text and entry["take"] == job.take
+            ):
+                if entry["scope"] != self.scope:
+                    self.record(job)
+                continue
+            source = by_content.get((str(Path(rel).parent), job.text, job.take))
+            if source is not None:
+                reuse.append((source, rel, job))
+            else:
+                pending.append(job)
+
+        # Copy reused clips aside first, so a clip moving onto the name of another
+        # reused clip is never overwritten before it has been copied
+        staged = []
+        for source, rel, job in reuse:
+            staged_path = self.root / f"{rel}.reuse"
+            shutil.copyfile(self.root / source, staged_path)
+            staged.append((staged_path, rel, job))
+
+        pruned_dirs = set()
+        for rel, entry in list(self.entries.items()):
+            if entry["scope"] == self.scope and rel not in planned:
+                try:
+                    (self.root / rel).unlink()
+                except FileNotFoundError:
+                    pass
+                self._append({"path": rel, "removed": True})
+                del self.entries[rel]
+                pruned_dirs.add(Path(rel).parent)
+                print(f"Pruned {self.root / rel}")
+        self._prune_phrase_dirs(pruned_dirs - {Path(rel).parent for rel in planned})
+
+        for staged_path, rel, job in staged:
+            os.replace(staged_path, self.root / rel)
+            self.record(job)
+
+        skipped = len(planned) - len(pending) - len(reuse)
+        print(f"Manifest: {skipped} clips up to date, {len(reuse)} reused, {len(pending)} to generate")
+        return pending
+
+    def _prune_phrase_dirs(self, phrase_dirs: set) -> None:
+        # Phrases removed from the subtitles file: drop their subtitles.csv, so the pack
+        # does not list clips that are gone, and their folders once nothing else is left
+        for phrase_dir in phrase_dirs:
+            folder = self.root / phrase_dir
+            try:
+                (folder / "subtitles.csv").unlink()
+            except FileNotFoundError:
+                pass
+            while folder != self.root:
+                try:
+                    folder.rmdir()
+                except OSError:
+                    break  # Not empty, or already gone
+                folder = folder.parent
+
+    def record(self, job) -> None:
+        rel = self.relative_path(job)
+        entry = {
+            "path": rel,
+            "text": job.text,
+            "take": job.take,
+            "voice_id": self.voice_id,
+            "model_id": self.model_id,
+            "scope": self.scope,
+            "size": os.path.getsize(self.root / rel),
+        }
+        self.entries[rel] = entry
+        self._append(entry)
+
+    def compact(self) -> None:
+        # Rewrite the journal with one line per live clip, atomically. The journal is
+        # replayed first: other builds of the same pack may have appended to it too.
+        self._journal.close()
+        self.entries = read_manifest(self.path)
+        write_manifest(self.path, self.entries)
+        self._journal = open(self.path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        self._journal.close()
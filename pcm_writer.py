@@ -0,0 +1,77 @@
+import os
+import wave
+
+import numpy as np
+
+from utils.audio_dsp import resample, to_int16
+
+PCM_FORMATS = ["pcm_16000", "pcm_22050", "pcm_24000", "pcm_44100", "pcm_48000"]
+
+
+def pcm_format_rate(output_format: str) -> int:
+    # Sample rate of an API pcm_<rate> output format, None for compressed formats
+    if output_format.startswith("pcm_"):
+        return int(output_format.split("_")[1])
+    return None
+
+
+class PcmWavWriter:
+    # Writes raw 16-bit mono PCM from the API straight into a WAV file as it arrives.
+    # Data goes to a .part file that is renamed over output_file once complete. When
+    # the requested sample rate differs from the API's, the clip is resampled on close.
+    def __init__(self, output_file: str, source_rate: int, sample_rate: int = None):
+        self.output_file = output_file
+        self.part_file = f"{output_file}.part"
+        self.source_rate = source_rate
+        self.sample_rate = sample_rate or source_rate
+        self._remainder = b""
+        self._buffer = bytearray() if self.sample_rate != source_rate else None
+        self._wav = wave.open(self.part_file, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(self.sample_rate)
+        self._frames = 0
+
+    def write(self, chunk: bytes) -> None:
+        # Chunks may split a sample in half; keep the odd byte for the next one
+        data = self._remainder + chunk
+        whole = len(data) - len(data) % 2
+        self._remainder = data[whole:]
+        if self._buffer is not None:
+            self._buffer += data[:whole]
+        else:
+            self._wav.writeframes(data[:whole])
+            self._frames += whole // 2
+
+    def close(self) -> bool:
+        # Finish the file; True once output_file is complete
+        if self._buffer is not None:
+            samples = np.frombuffer(bytes(self._buffer), dtype="<i2").astype(np.float64)
+            pcm = to_int16(resample(samples, self.source_rate, self.sample_rate)).tobytes()
+            self._wav.writeframes(pcm)
+            self._frames += len(pcm) // 2
+        self._wav.close()
+        if self._frames == 0:
+            print(f"Empty PCM response for {self.output_file}")
+            self._remove_part()
+            return False
+        os.replace(self.part_file, self.output_file)
+        return True
+
+    def abort(self) -> None:
+        self._wav.close()
+        self._remove_part()
+
+    def _remove_part(self) -> None:
+        try:
+            os.unlink(self.part_file)
+        except FileNotFoundError:
+            pass
+
+
+def convert_pcm_to_wav(input_file: str, output_file: str, source_rate: int, sample_rate: int = None) -> bool:
+    # Write a WAV from a raw PCM response kept in the cache
+    writer = PcmWavWriter(output_file, source_rate, sample_rate)
+    with open(input_file, "rb") as f:
+        writer.write(f.read())
+    return writer.close()
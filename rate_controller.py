@@ -0,0 +1,118 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+DEFAULT_MAX_RETRIES = 6
+BACKOFF_BASE = 1.0  # Seconds before the first retry
+BACKOFF_CAP = 60.0  # Never wait longer than this between retries
+
+
+def parse_retry_after(value) -> float:
+    # Retry-After is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateController:
+    # Limits how many requests are in flight and adapts that limit AIMD-style:
+    # every success window adds one slot, every throttle (429) halves the limit.
+    # A Retry-After from the API pauses all workers until it has elapsed.
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1, max_retries: int = DEFAULT_MAX_RETRIES):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.min_concurrency = max(min(min_concurrency, self.max_concurrency), 1)
+        self.max_retries = max_retries
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self.last_decrease = 0.0
+        self.started = time.monotonic()
+
+        # Counters
+        self.requests = 0
+        self.successes = 0
+        self.retries = 0
+        self.throttles = 0
+        self.server_errors = 0
+        self.failures = 0
+
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        # Hold one in-flight slot for the duration of a request
+        with self._cond:
+            while True:
+                wait = self.resume_at - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                elif self.in_flight >= int(self.limit):
+                    self._cond.wait()
+                else:
+                    break
+            self.in_flight += 1
+            self.requests += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def record_success(self) -> None:
+        with self._cond:
+            self.successes += 1
+            # Additive increase: roughly one extra slot per `limit` successes
+            self.limit = min(self.limit + 1.0 / self.limit, float(self.max_concurrency))
+            self._cond.notify_all()
+
+    def record_failure(self, status_code, retry_after: str = None, attempt: int = 0) -> float:
+        # Return the delay before retrying, or None if the request must not be retried.
+        # status_code is None for connection errors and timeouts.
+        with self._cond:
+            throttled = status_code == 429
+            retryable = status_code is None or throttled or status_code >= 500
+            if not retryable or attempt >= self.max_retries:
+                self.failures += 1
+                return None
+
+            self.retries += 1
+            now = time.monotonic()
+            if throttled:
+                self.throttles += 1
+            elif status_code is not None:
+                self.server_errors += 1
+
+            # Multiplicative decrease, at most once per backoff window so that a burst
+            # of 429s from requests already in flight does not collapse the limit
+            if throttled and now - self.last_decrease >= BACKOFF_BASE:
+                self.limit = max(self.limit / 2, float(self.min_concurrency))
+                self.last_decrease = now
+
+            # Full jitter exponential backoff, never shorter than the server asked for
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            server_delay = parse_retry_after(retry_after)
+            if server_delay is not None:
+                delay = server_delay + random.uniform(0, BACKOFF_BASE)
+                self.resume_at = max(self.resume_at, now + server_delay)
+            return delay
+
+    def requests_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.successes / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.successes} ok, {self.failures} failed, {self.retries} retries, "
+            f"{self.throttles} throttled, {self.server_errors} server errors, "
+            f"{self.requests_per_second():.2f} req/s, concurrency limit {int(self.limit)}"
+        )
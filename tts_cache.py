@@ -0,0 +1,162 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = ".tts_cache"
+DEFAULT_CACHE_MAX_MB = 2048
+EVICT_TO_RATIO = 0.9  # Once over the limit, evict down to this share of it, so puts do not evict one by one
+
+
+def cache_key(voice_id: str, model_id: str, voice_settings: dict, text: str, seed: int, output_format: str) -> str:
+    # Content address of one TTS response: everything that changes the audio returned
+    material = json.dumps(
+        {
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "voice_settings": voice_settings,
+            "text": text,
+            "seed": seed,
+            "output_format": output_format,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    # On-disk cache of API responses, one file per key under <cache_dir>/<key[:2]>/<key>.
+    # The file mtime is the LRU clock: a hit touches it, eviction removes the oldest.
+    # The directory is scanned once; from then on the LRU order is kept in memory, so a
+    # put never rescans the cache.
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_mb: float = DEFAULT_CACHE_MAX_MB):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # Path -> size, least recently used first
+        self._load()
+
+    def _load(self) -> None:
+        self._lru = OrderedDict((path, size) for path, size, _ in sorted(self.entries(), key=lambda e: e[2]))
+        self._total_bytes = sum(self._lru.values())
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def get(self, key: str) -> Path:
+        # Return the cached file for key, or None on a miss
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            # Files written by another process sharing the cache join the LRU order here
+            self._total_bytes += size - self._lru.pop(path, 0)
+            self._lru[path] = size
+        return path
+
+    def put_file(self, key: str, source: Path) -> Path:
+        # Move a freshly downloaded response into the cache and return its new path
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = os.path.getsize(source)
+        os.replace(source, path)
+        with self._lock:
+            self._total_bytes += size - self._lru.pop(path, 0)
+            self._lru[path] = size
+            if self._total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * EVICT_TO_RATIO), keep=path)
+        return path
+
+    def entries(self) -> list:
+        # (path, size, mtime) of every cached response
+        result = []
+        for sub in self.cache_dir.iterdir():
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub):
+                if entry.is_file():
+                    stat = entry.stat()
+                    result.append((Path(entry.path), stat.st_size, stat.st_mtime))
+        return result
+
+    def prune(self, max_mb: float) -> tuple:
+        # Evict least recently used entries until the cache fits in max_mb, rescanning
+        # the directory first in case other processes have changed it
+        with self._lock:
+            self._load()
+            return self._evict(int(max_mb * 1024 * 1024))
+
+    def _evict(self, limit_bytes: int, keep: Path = None) -> tuple:
+        removed = 0
+        freed = 0
+        for path in list(self._lru):
+            if self._total_bytes <= limit_bytes:
+                break
+            if path == keep:
+                continue
+            size = self._lru.pop(path)
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            self._total_bytes -= size
+            freed += size
+            removed += 1
+        return removed, freed
+
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self._total_bytes / 1024 / 1024:.1f} MB cached"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or prune the TTS response cache.")
+    parser.add_argument("command", choices=["inspect", "prune"], help="Action to run on the cache")
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help=f"Cache folder (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--max_mb",
+        type=float,
+        default=DEFAULT_CACHE_MAX_MB,
+        help=f"Size the cache is pruned down to, in MB (default: {DEFAULT_CACHE_MAX_MB})",
+    )
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.cache_dir):
+        print(f"Folder {args.cache_dir} not found.")
+        return
+
+    cache = TTSCache(args.cache_dir, args.max_mb)
+    if args.command == "inspect":
+        entries = cache.entries()
+        total = sum(size for _, size, _ in entries)
+        print(f"{len(entries)} cached responses, {total / 1024 / 1024:.1f} MB in {args.cache_dir}")
+        if entries:
+            oldest = min(mtime for _, _, mtime in entries)
+            newest = max(mtime for _, _, mtime in entries)
+            print(f"Least recently used: {datetime.datetime.fromtimestamp(oldest):%Y-%m-%d %H:%M:%S}")
+            print(f"Most recently used: {datetime.datetime.fromtimestamp(newest):%Y-%m-%d %H:%M:%S}")
+    else:
+        removed, freed = cache.prune(args.max_mb)
+        print(f"Removed {removed} cached responses, freed {freed / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
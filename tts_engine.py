@@ -0,0 +1,614 @@
+import argparse
+import csv
+import hashlib
+import queue
+import random
+import time
+import requests
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from clip_dedup import DEDUP_MODES, ClipDeduplicator
+from clip_metrics import MetricsSink, clip_record
+from mp3_decoder import DEFAULT_BATCH_SIZE, BatchDecoder, StreamingWavWriter
+from pack_manifest import PackManifest
+from pcm_writer import PCM_FORMATS, PcmWavWriter, convert_pcm_to_wav, pcm_format_rate
+from rate_controller import DEFAULT_MAX_RETRIES, RateController
+from tts_cache import DEFAULT_CACHE_MAX_MB, TTSCache, cache_key
+from utils.audio_dsp import DEFAULT_TRIM_PADDING_MS, DEFAULT_TRIM_THRESHOLD_DB, trim_wav_file
+
+API_BASE_URL = "https://api.elevenlabs.io"
+DEFAULT_WORKERS = 4
+DEFAULT_OUTPUT_FORMAT = "mp3_44100_128"
+DEFAULT_CONNECT_TIMEOUT = 10.0  # Seconds to open a connection to the API
+DEFAULT_READ_TIMEOUT = 60.0  # Seconds the API may go silent, before the response or between body chunks
+MODEL_ID = "eleven_multilingual_v2"
+VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.5,
+    "style": 0.6,
+    "use_speaker_boost": True,
+}
+
+
+@dataclass(frozen=True)
+class ClipJob:
+    # One clip to synthesize: the text, which take of it this is and where its WAV has to land
+    text: str
+    output_dir: Path
+    output_filename: str
+    take: int = 1
+
+
+@dataclass
+class SynthesisConfig:
+    # Settings shared by every clip of a run, filled from the command line
+    eleven_labs_api_key: str
+    voice_id: str
+    workers: int = DEFAULT_WORKERS
+    api_base_url: str = API_BASE_URL
+    max_retries: int = DEFAULT_MAX_RETRIES
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    read_timeout: float = DEFAULT_READ_TIMEOUT
+    deterministic_seed: bool = False
+    cache_dir: str = None
+    cache_max_mb: float = DEFAULT_CACHE_MAX_MB
+    decode_batch_size: int = DEFAULT_BATCH_SIZE
+    stream_decode: bool = False
+    output_format: str = DEFAULT_OUTPUT_FORMAT
+    sample_rate: int = None
+    trim_silence: bool = False
+    trim_threshold_db: float = DEFAULT_TRIM_THRESHOLD_DB
+    trim_padding_ms: float = DEFAULT_TRIM_PADDING_MS
+    normalize_dbfs: float = None
+    dedup: str = "link"
+    shard: tuple = None  # (index, count), index from 1
+    metrics_file: str = None
+
+
+def parse_shard(value: str) -> tuple:
+    # "2/4" -> (2, 4)
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got '{value}'")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+
+def add_engine_arguments(parser) -> None:
+    # Command-line options shared by both generator scripts
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Maximum number of clips synthesized concurrently (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--max_retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=f"Retries per clip on 429/5xx/connection errors (default: {DEFAULT_MAX_RETRIES})",
+    )
+    parser.add_argument(
+        "--connect_timeout",
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help=f"Seconds to wait for a connection to the API before retrying (default: {DEFAULT_CONNECT_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--read_timeout",
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        help="Seconds the API may send nothing, before the response or in the middle of it, "
+        f"before the request is retried (default: {DEFAULT_READ_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--api_base_url",
+        type=str,
+        default=API_BASE_URL,
+        help="Base URL of the text-to-speech API, e.g. a local stand-in server for testing",
+    )
+    parser.add_argument(
+        "--deterministic_seed",
+        action="store_true",
+        help="Derive each take's seed from the voice, text and take number instead of a random one",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        help="If provided, API responses are cached in this folder and reused on later runs; "
+        "implies --deterministic_seed, since responses are cached by seed",
+    )
+    parser.add_argument(
+        "--cache_max_mb",
+        type=float,
+        default=DEFAULT_CACHE_MAX_MB,
+        help=f"Maximum cache size in MB, least recently used entries are evicted (default: {DEFAULT_CACHE_MAX_MB})",
+    )
+    parser.add_argument(
+        "--decode_batch_size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"MP3 files converted per ffmpeg process, 1 converts each clip separately (default: {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--stream_decode",
+        action="store_true",
+        help="If provided, responses are decoded while they download and written straight to WAV, without an MP3 file",
+    )
+    parser.add_argument(
+        "--output_format",
+        type=str,
+        default=DEFAULT_OUTPUT_FORMAT,
+        choices=[DEFAULT_OUTPUT_FORMAT] + PCM_FORMATS,
+        help="Audio format requested from the API; pcm_* formats are written to WAV directly, without ffmpeg "
+        f"(default: {DEFAULT_OUTPUT_FORMAT})",
+    )
+    parser.add_argument(
+        "--sample_rate",
+        type=int,
+        help="Sample rate of the WAV files written from a pcm_* output format, e.g. 32000 for CrewChief "
+        "(default: the rate of the output format)",
+    )
+    parser.add_argument(
+        "--trim_silence",
+        action="store_true",
+        help="If provided, leading and trailing silence is trimmed from every clip once it is written",
+    )
+    parser.add_argument(
+        "--trim_threshold_db",
+        type=float,
+        default=DEFAULT_TRIM_THRESHOLD_DB,
+        help=f"10 ms frames quieter than this RMS level in dBFS count as silence (default: {DEFAULT_TRIM_THRESHOLD_DB})",
+    )
+    parser.add_argument(
+        "--trim_padding_ms",
+        type=float,
+        default=DEFAULT_TRIM_PADDING_MS,
+        help=f"Silence kept before and after the speech when trimming (default: {DEFAULT_TRIM_PADDING_MS})",
+    )
+    parser.add_argument(
+        "--normalize_dbfs",
+        type=float,
+        help="If provided, the RMS level of every clip is brought to this dBFS level (peaks stay under -1 dBFS)",
+    )
+    parser.add_argument(
+        "--dedup",
+        choices=DEDUP_MODES,
+        default="link",
+        help="Clips with the same text and take are synthesized once and the others are hardlinked to it (link), "
+        "copied from it (copy) or synthesized separately (off) (default: link)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        help="Only synthesize shard i of N (e.g. 2/4) of the pack, to split a build across N machines; "
+        "merge the outputs with merge_shards.py",
+    )
+    parser.add_argument(
+        "--metrics_file",
+        type=str,
+        help="If provided, the timings of every clip are appended to this JSONL file; "
+        "summarize them with clip_metrics.py summary",
+    )
+
+
+def config_from_args(args) -> SynthesisConfig:
+    if args.sample_rate and pcm_format_rate(args.output_format) is None:
+        raise SystemExit("--sample_rate needs a pcm_* --output_format")
+    if args.shard and not args.deterministic_seed:
+        raise SystemExit("--shard needs --deterministic_seed, so every machine requests the takes a single build would")
+    return SynthesisConfig(
+        eleven_labs_api_key=args.eleven_labs_api_key,
+        voice_id=args.voice_id,
+        workers=args.workers,
+        api_base_url=args.api_base_url,
+        max_retries=args.max_retries,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        deterministic_seed=args.deterministic_seed or bool(args.cache_dir),  # Random seeds would never hit the cache
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb,
+        decode_batch_size=args.decode_batch_size,
+        stream_decode=args.stream_decode,
+        output_format=args.output_format,
+        sample_rate=args.sample_rate,
+        trim_silence=args.trim_silence,
+        trim_threshold_db=args.trim_threshold_db,
+        trim_padding_ms=args.trim_padding_ms,
+        normalize_dbfs=args.normalize_dbfs,
+        dedup=args.dedup,
+        shard=args.shard,
+        metrics_file=args.metrics_file,
+    )
+
+
+def create_session(workers: int) -> requests.Session:
+    # One pooled session shared by every worker, so TLS connections are reused
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def plan_phrase_clips(phrase_dir: Path, phrase_key: str, variants: list, single_version: bool) -> list:
+    # Build the clips of a phrase in the same order as its subtitles.csv rows
+    jobs = []
+    audio_index = 1  # Counter for audio filenames
+
+    # Determine number of versions to generate based on the --single_version flag
+    num_versions = 1 if single_version else (2 if len(variants) >= 5 else 3)
+
+    for variant in variants:
+        for idx in range(1, num_versions + 1):  # 1, 2, or 3 versions depending on the flag
+            jobs.append(ClipJob(variant, phrase_dir, f"{phrase_key}_{audio_index}", idx))
+            audio_index += 1  # Increment counter
+    return jobs
+
+
+def normalize_text(text: str) -> str:
+    # Text as sent to the API; whitespace differences never change the cache key
+    return " ".join(text.split()) + "."
+
+
+def clip_key(job: ClipJob) -> tuple:
+    # What is sent to the API for a clip: clips with the same key are the same audio
+    return normalize_text(job.text), job.take
+
+
+def in_shard(job: ClipJob, shard: tuple) -> bool:
+    # Stable across machines and runs, and clips with the same key land in the same shard
+    index, count = shard
+    digest = hashlib.sha256(repr(clip_key(job)).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count == index - 1
+
+
+def take_seed(voice_id: str, text: str, take: int) -> int:
+    # Stable seed for the given take of a text, so reruns hit the cache
+    digest = hashlib.sha256(f"{voice_id}|{text}|{take}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % 9999998 + 1
+
+
+def run_jobs(config: SynthesisConfig, jobs: list, on_complete=None) -> int:
+    return run_clips(config, [(config, job) for job in jobs], on_complete)
+
+
+def run_clips(config: SynthesisConfig, clips: list, on_complete=None) -> int:
+    # Synthesize every (clip_config, job) of clips, in order, with at most `workers` requests
+    # in flight. The session, rate controller, cache and decoder come from config and are
+    # shared by every clip; each clip's own config gives its voice, format and post-processing.
+    # The rate controller retries throttled/failed requests and shrinks the
+    # effective concurrency below `workers` while the API pushes back.
+    # Downloaded MP3s are handed to the batch decoder, so workers move on to the
+    # next request while ffmpeg converts several clips in one process.
+    # on_complete(job, ok) is called from the main thread as each clip lands.
+    session = create_session(config.workers)
+    controller = RateController(config.workers, max_retries=config.max_retries)
+    cache = TTSCache(config.cache_dir, config.cache_max_mb) if config.cache_dir else None
+    decoder = BatchDecoder(config.decode_batch_size)
+    metrics = MetricsSink(config.metrics_file) if config.metrics_file else None
+    completed = queue.Queue()
+
+    def clip_finished(clip_config: SynthesisConfig, job: ClipJob, future: Future, record: dict) -> None:
+        try:
+            ok = future.result()
+            if record is not None and "_decode_started" in record:
+                record["decode_s"] = time.perf_counter() - record["_decode_started"]
+            if ok and (clip_config.trim_silence or clip_config.normalize_dbfs is not None):
+                post_started = time.perf_counter()
+                post_process_clip(clip_config, job)
+                if record is not None:
+                    record["post_s"] = time.perf_counter() - post_started
+        except Exception as e:
+            print(f"Failed to generate {job.output_dir}/{job.output_filename}: {e}")
+            ok = False
+        if record is not None:
+            record["ok"] = ok
+            record["total_s"] = time.perf_counter() - record["_submitted"]
+            metrics.write(record)
+        completed.put((job, ok))
+
+    def request_finished(clip_config: SynthesisConfig, job: ClipJob, future: Future, record: dict) -> None:
+        # The worker either failed or returned the decoder's future for its clip
+        if future.exception() is not None:
+            clip_finished(clip_config, job, future, record)
+        else:
+            future.result().add_done_callback(lambda decoded: clip_finished(clip_config, job, decoded, record))
+
+    failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(config.workers, 1)) as executor:
+            for clip_config, job in clips:
+                record = clip_record(job) if metrics is not None else None
+                future = executor.submit(
+                    generate_speech_elevenlabs,
+                    session=session,
+                    controller=controller,
+                    config=clip_config,
+                    job=job,
+                    decoder=decoder,
+                    cache=cache,
+                    metrics=record,
+                )
+                future.add_done_callback(
+                    lambda future, clip_config=clip_config, job=job, record=record: request_finished(
+                        clip_config, job, future, record
+                    )
+                )
+            for _ in range(len(clips)):
+                job, ok = completed.get()
+                if not ok:
+                    failed += 1
+                if on_complete is not None:
+                    on_complete(job, ok)
+    finally:
+        session.close()
+        decoder.close()
+        if metrics is not None:
+            metrics.close()
+    print(f"ElevenLabs requests: {controller.summary()}")
+    if decoder.batches:
+        print(f"Converted {decoder.files} MP3 files with {decoder.batches} ffmpeg runs")
+    if cache is not None:
+        print(f"Response cache: {cache.summary()}")
+    return failed
+
+
+def post_process_clip(config: SynthesisConfig, job: ClipJob) -> None:
+    # Trim silence and/or normalize the level of a freshly written clip in place
+    output_wav = f"{job.output_dir}/{job.output_filename}.wav"
+    threshold_db = config.trim_threshold_db if config.trim_silence else None
+    lead_ms, trail_ms = trim_wav_file(output_wav, output_wav, threshold_db, config.trim_padding_ms, config.normalize_dbfs)
+    if config.trim_silence:
+        print(f"Trimmed {lead_ms:.0f} ms + {trail_ms:.0f} ms of silence from {output_wav}")
+
+
+class PackBuild:
+    # One pack being generated: its manifest, deduplication and subtitles.csv files.
+    # prepare() returns the clips left to synthesize, on_complete() takes each result
+    # and finish() closes the manifest once they have all landed.
+    def __init__(self, config: SynthesisConfig, phrase_jobs: dict, manifest_root: Path, scope: str):
+        self.config = config
+        self.phrase_jobs = phrase_jobs  # {phrase_dir: [ClipJob, ...]} in subtitles.csv order
+        self.manifest = PackManifest(manifest_root, scope, config.voice_id, MODEL_ID)
+        self.dedup = ClipDeduplicator(config.dedup, key=clip_key)
+        self.csv_writer = PhraseCsvWriter()
+        self.pending = []
+        self.failed = 0
+
+    def prepare(self) -> list:
+        jobs = [job for jobs_of_phrase in self.phrase_jobs.values() for job in jobs_of_phrase]
+        self.pending = self.manifest.reconcile(jobs)
+        if self.config.shard:
+            # Audio indices and subtitles.csv rows come from the full plan, so the shards fit together
+            self.pending = [job for job in self.pending if in_shard(job, self.config.shard)]
+            print(f"Shard {self.config.shard[0]}/{self.config.shard[1]}: {len(self.pending)} clips to generate")
+
+        # The same text and take often appears under several phrases: synthesize it once
+        to_synthesize, ready = self.dedup.plan(jobs, self.pending)
+        for job in ready:
+            self.manifest.record(job)
+
+        ready_set = set(ready)
+        pending_per_phrase = Counter(job.output_dir for job in self.pending if job not in ready_set)
+        for phrase_dir, jobs_of_phrase in self.phrase_jobs.items():
+            self.csv_writer.add_phrase(phrase_dir, jobs_of_phrase, pending_per_phrase[phrase_dir])
+        return to_synthesize
+
+    def on_complete(self, job: ClipJob, ok: bool) -> None:
+        if ok:
+            self.manifest.record(job)
+        else:
+            self.failed += 1
+        self.csv_writer.clip_done(job.output_dir)
+        for follower in self.dedup.followers.get(job, []):
+            if ok and self.dedup.materialize(job, follower):
+                self.manifest.record(follower)
+            else:
+                self.failed += 1
+            self.csv_writer.clip_done(follower.output_dir)
+
+    def finish(self) -> int:
+        self.manifest.compact()
+        if self.dedup.calls_saved:
+            print(f"Deduplication: {self.dedup.summary()}")
+        if self.failed:
+            print(f"{self.failed} of {len(self.pending)} clips could not be generated, rerun to retry them")
+        return self.failed
+
+    def close(self) -> None:
+        self.manifest.close()
+
+
+def generate_phrases(config: SynthesisConfig, phrase_jobs: dict, manifest_root: Path, scope: str) -> int:
+    # Synthesize the clips of every phrase ({phrase_dir: [ClipJob, ...]}) that the pack
+    # manifest does not already have, and write each phrase's subtitles.csv
+    build = PackBuild(config, phrase_jobs, manifest_root, scope)
+
+    # Clips are synthesized concurrently; each subtitles.csv is written once its phrase is complete
+    try:
+        run_jobs(config, build.prepare(), on_complete=build.on_complete)
+        return build.finish()
+    finally:
+        build.close()
+
+
+def completed_future(ok: bool) -> Future:
+    future = Future()
+    future.set_result(ok)
+    return future
+
+
+def generate_speech_elevenlabs(
+    session: requests.Session,
+    controller: RateController,
+    config: SynthesisConfig,
+    job: ClipJob,
+    decoder: BatchDecoder,
+    cache: TTSCache = None,
+    metrics: dict = None,
+) -> Future:
+    # Returns a future resolving to True once the clip's WAV has been written.
+    # If metrics is given (see clip_metrics.py), the clip's timings are filled into it.
+    if metrics is None:
+        metrics = {}
+    url = f"{config.api_base_url}/v1/text-to-speech/{config.voice_id}"
+    text = normalize_text(job.text)
+    if config.deterministic_seed:
+        seed = take_seed(config.voice_id, text, job.take)
+    else:
+        seed = random.randrange(1, 9999999)
+
+    payload = {
+        "text": text,
+        "model_id": MODEL_ID,
+        "voice_settings": VOICE_SETTINGS,
+        "seed": seed,
+    }
+    headers = {
+        "Content-Type": "application/json",
+        "xi-api-key": config.eleven_labs_api_key,
+    }
+
+    # Raw PCM responses are written to WAV directly, MP3 responses go through ffmpeg
+    pcm_rate = pcm_format_rate(config.output_format)
+    full_output_filename = f"{job.output_dir}/{job.output_filename}.{'pcm' if pcm_rate else 'mp3'}"
+    output_wav = f"{job.output_dir}/{job.output_filename}.wav"
+    part_file = Path(f"{full_output_filename}.part")  # The response is only renamed once complete
+
+    key = None
+    if cache is not None:
+        key = cache_key(config.voice_id, MODEL_ID, VOICE_SETTINGS, text, seed, config.output_format)
+        cached_file = cache.get(key)
+        if cached_file is not None:
+            print(f"Cached {output_wav}")
+            metrics["cached"] = True
+            metrics["_decode_started"] = time.perf_counter()
+            if pcm_rate:
+                return completed_future(convert_pcm_to_wav(str(cached_file), output_wav, pcm_rate, config.sample_rate))
+            return decoder.submit(str(cached_file), output_wav)
+
+    attempt = 0
+    while True:
+        with controller.slot():
+            # PCM responses, and MP3 responses in streaming mode, are written to WAV while
+            # they download; no response file is kept unless the cache needs a copy of it
+            if pcm_rate:
+                streaming_writer = PcmWavWriter(output_wav, pcm_rate, config.sample_rate)
+            elif config.stream_decode:
+                streaming_writer = StreamingWavWriter(output_wav)
+            else:
+                streaming_writer = None
+            keep_mp3 = streaming_writer is None or cache is not None
+            try:
+                request_started = time.perf_counter()
+                metrics.setdefault("wait_s", request_started - metrics.get("_submitted", request_started))
+                response = session.post(
+                    url,
+                    params={"output_format": config.output_format},
+                    json=payload,
+                    headers=headers,
+                    stream=True,
+                    timeout=(config.connect_timeout, config.read_timeout),
+                )
+                if response.status_code == 200:
+                    first_byte = None
+                    received = 0
+                    write_time = 0.0
+                    with open(part_file, "wb") if keep_mp3 else nullcontext() as f:
+                        for chunk in response.iter_content(chunk_size=1024):
+                            if chunk:
+                                chunk_received = time.perf_counter()
+                                if first_byte is None:
+                                    first_byte = chunk_received
+                                received += len(chunk)
+                                if f is not None:
+                                    f.write(chunk)
+                                if streaming_writer is not None:
+                                    streaming_writer.write(chunk)
+                                write_time += time.perf_counter() - chunk_received
+                    if keep_mp3:
+                        part_file.replace(full_output_filename)
+                    controller.record_success()
+                    metrics.update(
+                        attempts=attempt + 1,
+                        ttfb_s=(first_byte or time.perf_counter()) - request_started,
+                        http_s=time.perf_counter() - request_started,
+                        write_s=write_time,
+                        bytes=received,
+                    )
+                    break
+                status_code, retry_after = response.status_code, response.headers.get("Retry-After")
+                error = f"{response.status_code} - {response.text}"
+            except requests.RequestException as e:
+                status_code, retry_after, error = None, None, str(e)
+            except OSError as e:
+                # ffmpeg exited while the clip was still streaming in, or the response
+                # file could not be written (disk full, permissions)
+                print(f"An error occurred while writing {output_wav}: {e}")
+                if streaming_writer is not None:
+                    streaming_writer.abort()
+                part_file.unlink(missing_ok=True)
+                return completed_future(False)
+            if streaming_writer is not None:
+                streaming_writer.abort()
+            part_file.unlink(missing_ok=True)
+
+        delay = controller.record_failure(status_code, retry_after, attempt)
+        if delay is None:
+            print(f"Error from ElevenLabs API: {error}")
+            return completed_future(False)
+        print(f"Retrying {job.output_filename} in {delay:.1f}s after: {error}")
+        time.sleep(delay)
+        attempt += 1
+
+    metrics["_decode_started"] = time.perf_counter()
+    if streaming_writer is not None:
+        ok = streaming_writer.close()
+        if cache is not None:
+            cache.put_file(key, Path(full_output_filename))
+        print(f"Generated {output_wav}")
+        return completed_future(ok)
+
+    print(f"Generated {full_output_filename}")
+
+    if cache is not None:
+        # The response now lives in the cache and is converted from there
+        cached_file = cache.put_file(key, Path(full_output_filename))
+        return decoder.submit(str(cached_file), output_wav)
+
+    # Convert to WAV, the MP3 file is removed once converted
+    return decoder.submit(full_output_filename, output_wav, remove_input=True)
+
+
+class PhraseCsvWriter:
+    # Writes each phrase's subtitles.csv once all of its clips have completed
+    def __init__(self):
+        self._pending = {}
+        self._rows = {}
+
+    def add_phrase(self, phrase_dir: Path, jobs: list, pending: int) -> None:
+        # pending is how many of the phrase's clips still have to be synthesized
+        self._rows[phrase_dir] = [[f"{job.output_filename}.wav", job.text] for job in jobs]
+        self._pending[phrase_dir] = pending
+        if not pending:
+            self.write(phrase_dir)
+
+    def clip_done(self, phrase_dir: Path) -> None:
+        self._pending[phrase_dir] -= 1
+        if self._pending[phrase_dir] == 0:
+            self.write(phrase_dir)
+
+    def write(self, phrase_dir: Path) -> None:
+        # Create CSV file in the same directory as the WAV files
+        csv_file_path = phrase_dir / "subtitles.csv"
+        with open(csv_file_path, "w", newline='') as csvfile:
+            csv_writer = csv.writer(csvfile, quoting=csv.QUOTE_MINIMAL)
+            for row in self._rows[phrase_dir]:
+                csv_writer.writerow(row)
@@ -0,0 +1,283 @@
+import wave
+from math import gcd
+
+import numpy as np
+
+RESAMPLE_ZERO_CROSSINGS = 16  # Filter half-length in zero crossings of the lowpass sinc
+RESAMPLE_KAISER_BETA = 8.6
+DEFAULT_TRIM_THRESHOLD_DB = -45.0
+DEFAULT_TRIM_PADDING_MS = 30.0
+
+
+def resample_filter(up: int, down: int) -> np.ndarray:
+    # Kaiser-windowed sinc lowpass for upsampling by `up`, cut at the lower of the two Nyquists
+    cutoff = 1.0 / max(up, down)
+    half_len = RESAMPLE_ZERO_CROSSINGS * max(up, down)
+    n = np.arange(-half_len, half_len + 1)
+    return up * cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), RESAMPLE_KAISER_BETA)
+
+
+class StreamingResampler:
+    # Polyphase rational resampler fed block by block. It keeps just enough past input
+    # to compute the next outputs, so memory does not grow with the clip length, and
+    # the concatenated output is the same as resampling the whole clip at once.
+    def __init__(self, from_rate: int, to_rate: int, channels: int):
+        g = gcd(from_rate, to_rate)
+        self.up, self.down = to_rate // g, from_rate // g
+        h = resample_filter(self.up, self.down)
+        self.half_len = (len(h) - 1) // 2
+
+        # Taps of each output phase p are h[p], h[p + up], h[p + 2 * up], ...
+        self.taps_per_phase = -(-len(h) // self.up)
+        self.phases = np.zeros((self.up, self.taps_per_phase))
+        for p in range(self.up):
+            phase_taps = h[p::self.up]
+            self.phases[p, :len(phase_taps)] = phase_taps
+
+        # Input before the first sample is silence
+        self.buffer = np.zeros((self.taps_per_phase - 1, channels))
+        self.buffer_start = -(self.taps_per_phase - 1)  # Input index of buffer[0]
+        self.received = 0
+        self.next_output = 0
+
+    def _newest(self, k: np.ndarray) -> np.ndarray:
+        # Newest input sample contributing to output k
+        return (k * self.down + self.half_len) // self.up
+
+    def _produce(self, last_output: int) -> np.ndarray:
+        # Outputs next_output..last_output-1 from the buffered input
+        blocks = []
+        block = 8192  # Output samples per vectorized block, bounds the window matrix size
+        for start in range(self.next_output, last_output, block):
+            k = np.arange(start, min(start + block, last_output))
+            newest = self._newest(k) - self.buffer_start
+            windows = newest[:, None] - np.arange(self.taps_per_phase)[None, :]
+            taps = self.phases[(k * self.down + self.half_len) % self.up]
+            blocks.append(np.einsum("ijc,ij->ic", self.buffer[windows], taps))
+        self.next_output = max(last_output, self.next_output)
+
+        # Drop input no later output will need
+        drop = int(self._newest(np.int64(self.next_output))) - (self.taps_per_phase - 1) - self.buffer_start
+        if drop > 0:
+            self.buffer = self.buffer[drop:]
+            self.buffer_start += drop
+        if not blocks:
+            return np.zeros((0, self.buffer.shape[1]))
+        return np.concatenate(blocks)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        self.buffer = np.concatenate([self.buffer, block])
+        self.received += len(block)
+        # Every output whose newest input sample has arrived
+        last_output = (self.received * self.up - 1 - self.half_len) // self.down + 1
+        return self._produce(max(last_output, self.next_output))
+
+    def flush(self) -> np.ndarray:
+        # Input after the last sample is silence
+        tail = np.zeros((self.half_len // self.up + 2, self.buffer.shape[1]))
+        self.buffer = np.concatenate([self.buffer, tail])
+        return self._produce(-(-self.received * self.up // self.down))
+
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    # Polyphase rational resampling of a 1-D (frames) or 2-D (frames x channels) float array
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    frames = samples.reshape(len(samples), -1)
+    resampler = StreamingResampler(from_rate, to_rate, frames.shape[1])
+    out = np.concatenate([resampler.process(frames), resampler.flush()])
+    return out.reshape((len(out),) + samples.shape[1:])
+
+
+def to_int16(samples: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(samples), -32768, 32767).astype("<i2")
+
+
+def read_wav(path: str) -> tuple:
+    # (samples as float64 frames x channels in 16-bit scale, sample rate, sample width)
+    with wave.open(path, "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        sample_rate = wav_file.getframerate()
+        data = wav_file.readframes(wav_file.getnframes())
+    return pcm_to_float(data, sample_width, channels), sample_rate, sample_width
+
+
+def pcm_to_float(data: bytes, sample_width: int, channels: int) -> np.ndarray:
+    # Decode little-endian PCM into float64 samples scaled like 16-bit audio
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float64) - 128) * 256
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float64)
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        as_int = (raw[:, 0].astype(np.int32) | raw[:, 1].astype(np.int32) << 8 | raw[:, 2].astype(np.int32) << 16)
+        samples = (np.where(as_int >= 1 << 23, as_int - (1 << 24), as_int)).astype(np.float64) / 256
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype="<i4").astype(np.float64) / 65536
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    return samples.reshape(-1, channels)
+
+
+def float_to_pcm(samples: np.ndarray, sample_width: int) -> bytes:
+    # Encode float64 samples in 16-bit scale back to little-endian PCM, clipping like pydub does
+    if sample_width == 1:
+        return (np.clip(np.round(samples / 256), -128, 127) + 128).astype(np.uint8).tobytes()
+    if sample_width == 2:
+        return to_int16(samples).tobytes()
+    if sample_width == 3:
+        as_int = np.clip(np.round(samples * 256), -(1 << 23), (1 << 23) - 1).astype("<i4")
+        return as_int.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    if sample_width == 4:
+        return np.clip(np.round(samples * 65536), -(1 << 31), (1 << 31) - 1).astype("<i4").tobytes()
+    raise ValueError(f"Unsupported sample width: {sample_width}")
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int, sample_width: int) -> None:
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(samples.shape[1])
+        wav_file.setsampwidth(sample_width)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(float_to_pcm(samples, sample_width))
+
+
+def lowpass_filter(cutoff_hz: float, sample_rate: int, num_taps: int = 101) -> np.ndarray:
+    # Hamming-windowed sinc FIR lowpass with unity gain at DC
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    h = np.sinc(2 * cutoff_hz / sample_rate * n) * np.hamming(num_taps)
+    return h / h.sum()
+
+
+def fir_filter(samples: np.ndarray, taps: np.ndarray) -> np.ndarray:
+    # Zero-phase (centered) FIR filtering of every channel, output as long as the input
+    delay = (len(taps) - 1) // 2
+    out = np.empty_like(samples)
+    for channel in range(samples.shape[1]):
+        out[:, channel] = np.convolve(samples[:, channel], taps)[delay:delay + len(samples)]
+    return out
+
+
+def db_to_ratio(gain_db: float) -> float:
+    return 10 ** (gain_db / 20)
+
+
+class GainStage:
+    def __init__(self, gain_db: float):
+        self.ratio = db_to_ratio(gain_db)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        return block * self.ratio
+
+    def flush(self) -> np.ndarray:
+        return None
+
+
+class FirStage:
+    # Centered FIR filter fed block by block; keeps the last len(taps) - 1 input samples
+    # between blocks, so the output matches fir_filter() on the whole clip
+    def __init__(self, taps: np.ndarray, channels: int):
+        self.taps = taps
+        self.history = np.zeros((len(taps) - 1, channels))
+        self.skip = (len(taps) - 1) // 2  # Leading outputs that belong before the clip starts
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if len(block) == 0:
+            return block
+        data = np.concatenate([self.history, block])
+        out = np.empty_like(block)
+        for channel in range(block.shape[1]):
+            out[:, channel] = np.convolve(data[:, channel], self.taps, mode="valid")
+        self.history = data[len(data) - len(self.history):]
+        if self.skip:
+            dropped = min(self.skip, len(out))
+            out = out[dropped:]
+            self.skip -= dropped
+        return out
+
+    def flush(self) -> np.ndarray:
+        # Push out the outputs still held back by the filter delay
+        return self.process(np.zeros(((len(self.taps) - 1) // 2, self.history.shape[1])))
+
+
+class ResampleStage:
+    def __init__(self, from_rate: int, to_rate: int, channels: int):
+        self.resampler = StreamingResampler(from_rate, to_rate, channels) if from_rate != to_rate else None
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        return self.resampler.process(block) if self.resampler else block
+
+    def flush(self) -> np.ndarray:
+        return self.resampler.flush() if self.resampler else None
+
+
+def trim_bounds(
+    samples: np.ndarray, sample_rate: int, threshold_db: float, padding_ms: float, frame_ms: float = 10
+) -> tuple:
+    # (start, end) frames of samples[start:end] once leading and trailing frames whose RMS
+    # stays under threshold_db (dBFS) are dropped, keeping padding_ms of silence on each side.
+    # A clip that is silent from start to end is kept whole.
+    frame = max(int(sample_rate * frame_ms / 1000), 1)
+    power = np.mean(np.square(samples), axis=1)
+    n_frames = -(-len(power) // frame)
+    power = np.concatenate([power, np.zeros(n_frames * frame - len(power))])
+    rms = np.sqrt(power.reshape(n_frames, frame).mean(axis=1))
+
+    loud = np.flatnonzero(rms > 32768 * db_to_ratio(threshold_db))
+    if not loud.size:
+        return 0, len(samples)
+    padding = int(sample_rate * padding_ms / 1000)
+    return max(loud[0] * frame - padding, 0), min((loud[-1] + 1) * frame + padding, len(samples))
+
+
+def normalize_gain_db(samples: np.ndarray, target_dbfs: float, peak_ceiling_dbfs: float = -1.0) -> float:
+    # Gain that brings the RMS level to target_dbfs without pushing the peak over the ceiling
+    rms = np.sqrt(np.mean(np.square(samples))) if len(samples) else 0
+    peak = np.abs(samples).max() if len(samples) else 0
+    if rms == 0:
+        return 0.0
+    gain_db = target_dbfs - 20 * np.log10(rms / 32768)
+    return float(min(gain_db, peak_ceiling_dbfs - 20 * np.log10(peak / 32768)))
+
+
+def trim_wav_file(
+    input_file: str,
+    output_file: str,
+    threshold_db: float = DEFAULT_TRIM_THRESHOLD_DB,
+    padding_ms: float = DEFAULT_TRIM_PADDING_MS,
+    normalize_dbfs: float = None,
+) -> tuple:
+    # Trim leading/trailing silence (unless threshold_db is None) and optionally normalize
+    # the level of one clip. Returns the milliseconds trimmed from the start and from the end.
+    samples, sample_rate, sample_width = read_wav(input_file)
+    start, end = 0, len(samples)
+    if threshold_db is not None:
+        start, end = trim_bounds(samples, sample_rate, threshold_db, padding_ms)
+    trimmed_end = len(samples) - end
+    samples = samples[start:end]
+    if normalize_dbfs is not None:
+        samples = samples * db_to_ratio(normalize_gain_db(samples, normalize_dbfs))
+    write_wav(output_file, samples, sample_rate, sample_width)
+    return 1000 * start / sample_rate, 1000 * trimmed_end / sample_rate
+
+
+def crossfade_concat(pieces: list, gaps: list, crossfade: int) -> np.ndarray:
+    # Join frames x channels arrays, gaps[i] frames of silence going between pieces[i] and
+    # pieces[i + 1]. Pieces joined without a gap overlap by `crossfade` frames with a linear
+    # crossfade; around a gap each side fades out/in over `crossfade` frames instead.
+    starts = [0]
+    for i in range(1, len(pieces)):
+        overlap = 0 if gaps[i - 1] else min(crossfade, len(pieces[i - 1]), len(pieces[i]))
+        starts.append(starts[-1] + len(pieces[i - 1]) + gaps[i - 1] - overlap)
+    out = np.zeros((starts[-1] + len(pieces[-1]), pieces[0].shape[1]))
+
+    for i, piece in enumerate(pieces):
+        piece = piece.copy()
+        if i > 0:
+            fade = min(crossfade, len(piece))
+            piece[:fade] *= np.linspace(0, 1, fade, endpoint=False)[:, None]
+        if i < len(pieces) - 1:
+            fade = min(crossfade, len(piece))
+            piece[len(piece) - fade:] *= np.linspace(1, 0, fade, endpoint=False)[:, None]
+        out[starts[i]:starts[i] + len(piece)] += piece
+    return out
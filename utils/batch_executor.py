@@ -0,0 +1,77 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def collect_wav_files(input_folder: str, output_folder: str) -> list:
+    # Mirror the folder structure of input_folder in output_folder and return the
+    # (input_file, output_file) pair of every WAV file, largest first
+    pairs = []
+    for root, dirs, files in os.walk(input_folder):
+        relative_path = os.path.relpath(root, input_folder)
+        output_subfolder = os.path.join(output_folder, relative_path)
+        os.makedirs(output_subfolder, exist_ok=True)
+        for filename in files:
+            if filename.endswith(".wav"):
+                pairs.append((os.path.join(root, filename), os.path.join(output_subfolder, filename)))
+
+    # Largest files first, so no long file starts last and leaves the other workers idle
+    pairs.sort(key=lambda pair: os.path.getsize(pair[0]), reverse=True)
+    return pairs
+
+
+def _run_task(func, input_file: str, output_file: str, args: tuple) -> tuple:
+    # Runs in the worker: a failing file is reported instead of taking the pool down.
+    # Returns (error, note), note being whatever text func returned for the progress line.
+    try:
+        note = func(input_file, output_file, *args)
+    except Exception:
+        return traceback.format_exc(), None
+    return None, note if isinstance(note, str) else None
+
+
+def run_batch(func, pairs: list, args: tuple = (), jobs: int = None) -> list:
+    # Call func(input_file, output_file, *args) for every pair on `jobs` processes
+    # (all cores by default, in this process when jobs is 1) and return the files that failed.
+    # func must be a module-level function so it can be sent to the worker processes.
+    jobs = jobs or os.cpu_count() or 1
+    total = len(pairs)
+    failed = []
+
+    def report(done: int, input_file: str, output_file: str, result: tuple) -> None:
+        error, note = result
+        if error is None:
+            print(f"[{done}/{total}] Processed: {input_file} -> {output_file}" + (f" ({note})" if note else ""))
+        else:
+            failed.append(input_file)
+            print(f"[{done}/{total}] Failed: {input_file}\n{error}")
+
+    if jobs == 1:
+        for done, (input_file, output_file) in enumerate(pairs, start=1):
+            report(done, input_file, output_file, _run_task(func, input_file, output_file, args))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(_run_task, func, input_file, output_file, args): (input_file, output_file)
+                for input_file, output_file in pairs
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                input_file, output_file = futures[future]
+                try:
+                    result = future.result()
+                except Exception:
+                    result = traceback.format_exc(), None  # The worker process itself died
+                report(done, input_file, output_file, result)
+
+    if failed:
+        print(f"{len(failed)} of {total} files failed")
+    return failed
+
+
+def add_jobs_argument(parser) -> None:
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=os.cpu_count(),
+        help="Number of files processed in parallel (default: number of CPU cores)",
+    )
@@ -2,61 +2,137 @@ import os
 import argparse
 import csv
 import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+SKIPPED_PREFIXES = ('radio_check_', 'spotter_')
+DEFAULT_WORKERS = 16
 
 # Function to read a subtitles.csv file and extract phrases
 def read_subtitles_csv(file_path):
-    phrases = set()  # Use a set to avoid duplicates
+    phrases = {}  # Use a dict to avoid duplicates while keeping the file order
     with open(file_path, 'r', encoding='utf-8') as csvfile:
         reader = csv.reader(csvfile)
         for row in reader:
             if len(row) > 1:
                 phrase = row[1].strip('"')  # Get the phrase and remove any surrounding quotes
-                phrases.add(phrase)  # Add the phrase to the set
+                phrases[phrase] = None  # Add the phrase to the dict
     return list(phrases)
 
-# Recursive function to process directories and build the structure
-def process_folders(path):
+# List one directory: its subdirectories and the (mtime_ns, size) of its subtitles.csv, if any
+def scan_dir(path):
+    subdirs = []
+    csv_stat = None
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            elif entry.name == 'subtitles.csv' and entry.is_file():
+                stat = entry.stat()
+                csv_stat = (stat.st_mtime_ns, stat.st_size)
+    return subdirs, csv_stat
+
+# Crawl the tree with several threads listing directories at once.
+# Returns {relative dir: (mtime_ns, size) of its subtitles.csv or None}
+def crawl(path, workers=DEFAULT_WORKERS):
+    found = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(scan_dir, path): os.curdir}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                relative_path = pending.pop(future)
+                subdirs, csv_stat = future.result()
+                found[relative_path] = csv_stat
+                for subdir in subdirs:
+                    # Skip directories that start with 'radio_check_' or 'spotter_'
+                    if subdir.startswith(SKIPPED_PREFIXES):
+                        continue
+                    child = subdir if relative_path == os.curdir else os.path.join(relative_path, subdir)
+                    pending[executor.submit(scan_dir, os.path.join(path, child))] = child
+    return found
+
+# Build the structure from the crawled tree. Only the subtitles.csv files whose mtime or
+# size differ from the previous index are parsed again; returns the new index too
+def process_folders(path, index=None, workers=DEFAULT_WORKERS):
+    index = index or {}
+    found = crawl(path, workers)
+
+    changed = [
+        relative_path for relative_path, csv_stat in found.items()
+        if csv_stat is not None and (
+            relative_path not in index
+            or (index[relative_path]['mtime_ns'], index[relative_path]['size']) != csv_stat
+        )
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        csv_paths = [os.path.join(path, relative_path, 'subtitles.csv') for relative_path in changed]
+        parsed = dict(zip(changed, executor.map(read_subtitles_csv, csv_paths)))
+
     structure = {}
+    nodes = {(): structure}  # Parent path -> its dict, so the structure is not re-traversed for each file
+    new_index = {}
     total_phrases = 0
     missing_subtitles = []
-
-    # Walk through the directory and find 'subtitles.csv' files
-    for root, dirs, files in os.walk(path):
-        # Skip directories that start with 'radio_check_' or 'spotter_'
-        dirs[:] = [d for d in dirs if not (d.startswith('radio_check_') or d.startswith('spotter_'))]
-
-        relative_path = os.path.relpath(root, path)
+    for relative_path in sorted(found, key=lambda relative_path: relative_path.split(os.sep)):
+        csv_stat = found[relative_path]
         subdirs = relative_path.split(os.sep)
 
-        # Search for subtitles.csv
-        found_subtitles = False
-        for file in files:
-            if file == 'subtitles.csv':
-                found_subtitles = True
-                file_path = os.path.join(root, file)
-                phrases = read_subtitles_csv(file_path)
-                total_phrases += len(phrases)
-
-                # Build the dictionary recursively
-                current_node = structure
-                for subdir in subdirs[:-1]:  # Exclude the last subdir for now
-                    if subdir not in current_node:
-                        current_node[subdir] = {}
-                    current_node = current_node[subdir]
-
-                # Assign the phrases directly to the last subdir level
-                current_node[subdirs[-1]] = phrases
-
         # Only include paths with subdirectories and exclude base-level directories
-        if not found_subtitles and len(subdirs) > 1:
-            missing_subtitles.append(relative_path)
-
-    return structure, total_phrases, missing_subtitles
+        if csv_stat is None:
+            if len(subdirs) > 1:
+                missing_subtitles.append(relative_path)
+            continue
+
+        phrases = parsed[relative_path] if relative_path in parsed else index[relative_path]['phrases']
+        new_index[relative_path] = {'mtime_ns': csv_stat[0], 'size': csv_stat[1], 'phrases': phrases}
+        total_phrases += len(phrases)
+
+        parent = tuple(subdirs[:-1])
+        if parent not in nodes:
+            current_node = structure
+            for subdir in parent:
+                current_node = current_node.setdefault(subdir, {})
+            nodes[parent] = current_node
+
+        # Assign the phrases directly to the last subdir level
+        nodes[parent][subdirs[-1]] = phrases
+
+    print(f"Parsed {len(changed)} changed subtitles.csv files, {len(new_index) - len(changed)} unchanged")
+    return structure, total_phrases, missing_subtitles, new_index
+
+# Phrases added and removed per folder between two indexes
+def diff_index(old_index, new_index):
+    added = {}
+    removed = {}
+    for relative_path in sorted(set(old_index) | set(new_index)):
+        old_phrases = old_index.get(relative_path, {}).get('phrases', [])
+        new_phrases = new_index.get(relative_path, {}).get('phrases', [])
+        old_set = set(old_phrases)
+        new_set = set(new_phrases)
+        plus = [phrase for phrase in new_phrases if phrase not in old_set]
+        minus = [phrase for phrase in old_phrases if phrase not in new_set]
+        if plus:
+            added[relative_path] = plus
+        if minus:
+            removed[relative_path] = minus
+    return {"added": added, "removed": removed}
+
+def load_index(index_file, folder_path):
+    # The index is only reused for the folder it was built from
+    if not os.path.exists(index_file):
+        return {}
+    with open(index_file, 'r', encoding='utf-8') as jsonfile:
+        data = json.load(jsonfile)
+    if data.get('folder') != os.path.abspath(folder_path):
+        return {}
+    return data['entries']
 
 # Main function to handle command-line arguments and execute the script
 def main():
     parser = argparse.ArgumentParser(description="Process folder, find 'subtitles.csv' files, extract phrases, and save to JSON.")
     parser.add_argument('--folder', type=str, required=True, help='The folder to process')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'Directories listed and files parsed at once (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--full', action='store_true', help='Ignore the index of the previous run and parse every subtitles.csv')
     args = parser.parse_args()
 
     folder_path = args.folder
@@ -68,8 +144,12 @@ def main():
     if os.path.exists(folder_path) and os.path.isdir(folder_path):
         print(f"The folder '{folder_path}' exists. Processing and extracting phrases...")
 
-        # Process the folder and build the structure
-        structure, total_phrases, missing_subtitles = process_folders(folder_path)
+        # Process the folder and build the structure, reusing the phrases of unchanged files
+        index_file = f"{folder_name}_subtitles_index.json"
+        old_index = load_index(index_file, folder_path)
+        structure, total_phrases, missing_subtitles, new_index = process_folders(
+            folder_path, {} if args.full else old_index, args.workers
+        )
 
         # Save the structure to <folder_name>_subtitles.json
         output_file = f"{folder_name}_subtitles.json"
@@ -85,7 +165,19 @@ def main():
         with open(missing_output_file, 'w', encoding='utf-8') as jsonfile:
             json.dump(missing_data, jsonfile, indent=2, ensure_ascii=False)
 
-        print(f"Processing complete. The files {output_file} and {missing_output_file} have been generated.")
+        # Save what was added or removed since the last extraction to <folder_name>_subtitles_diff.json
+        diff_output_file = f"{folder_name}_subtitles_diff.json"
+        diff = diff_index(old_index, new_index)
+        with open(diff_output_file, 'w', encoding='utf-8') as jsonfile:
+            json.dump(diff, jsonfile, indent=2, ensure_ascii=False)
+
+        with open(index_file, 'w', encoding='utf-8') as jsonfile:
+            json.dump({"folder": os.path.abspath(folder_path), "entries": new_index}, jsonfile, ensure_ascii=False)
+
+        added = sum(len(phrases) for phrases in diff["added"].values())
+        removed = sum(len(phrases) for phrases in diff["removed"].values())
+        print(f"{added} phrases added and {removed} removed since the last extraction")
+        print(f"Processing complete. The files {output_file}, {missing_output_file} and {diff_output_file} have been generated.")
     else:
         print(f"Error: The folder '{folder_path}' does not exist or is not a directory.")
 
@@ -1,35 +1,36 @@
 import os
 import argparse
 from pydub import AudioSegment
+from batch_executor import add_jobs_argument, collect_wav_files, run_batch
+from process_pack import process_file
 
-def increase_gain(input_folder: str, gain_db: float) -> None:
+def increase_file_gain(input_file_path: str, output_file_path: str, gain_db: float) -> None:
+    audio = AudioSegment.from_wav(input_file_path)
+    # Increase the gain
+    louder_audio = audio + gain_db
+    louder_audio.export(output_file_path, format='wav')
+
+def increase_gain(input_folder: str, gain_db: float, jobs: int = None, streaming: bool = False) -> None:
     output_folder = f"{input_folder}_gain"
     os.makedirs(output_folder, exist_ok=True)
 
-    for root, _, files in os.walk(input_folder):
-        for file in files:
-            if file.endswith('.wav'):
-                input_file_path = os.path.join(root, file)
-                audio = AudioSegment.from_wav(input_file_path)
-                # Increase the gain
-                louder_audio = audio + gain_db
-
-                # Create the folder structure in the output folder
-                relative_path = os.path.relpath(root, input_folder)
-                output_subfolder = os.path.join(output_folder, relative_path)
-                os.makedirs(output_subfolder, exist_ok=True)
-
-                output_file_path = os.path.join(output_subfolder, file)
-                louder_audio.export(output_file_path, format='wav')
-                print(f"Increased gain for {input_file_path} to {output_file_path}")
+    # Create the folder structure in the output folder and process the files in parallel
+    files = collect_wav_files(input_folder, output_folder)
+    if streaming:
+        # Block by block with constant memory instead of loading each file into pydub
+        run_batch(process_file, files, ([("gain", gain_db)],), jobs)
+    else:
+        run_batch(increase_file_gain, files, (gain_db,), jobs)
 
 if __name__ == "__main__":
     # argparse configuration
     parser = argparse.ArgumentParser(description="Increase gain of WAV files in a folder.")
     parser.add_argument('--input_folder', required=True, help="Path to the input folder containing WAV files")
     parser.add_argument('--gain', type=float, required=True, help="Gain value in dB (e.g., 5 for +5dB)")
+    parser.add_argument('--streaming', action='store_true', help="Process the files block by block with constant memory")
+    add_jobs_argument(parser)
 
     args = parser.parse_args()
 
     # Call the function with provided arguments
-    increase_gain(args.input_folder, args.gain)
+    increase_gain(args.input_folder, args.gain, args.jobs, args.streaming)
@@ -0,0 +1,190 @@
+import os
+import mmap
+import zlib
+import struct
+import argparse
+import tempfile
+
+ARCHIVE_MAGIC = b"VPAK"
+ARCHIVE_VERSION = 1
+HEADER = struct.Struct("<4sIQQ")  # Magic, version, index offset, number of entries
+INDEX_ENTRY = struct.Struct("<QQII")  # Blob offset, blob length, CRC-32, length of the UTF-8 path that follows
+CHUNK_SIZE = 1024 * 1024  # Bytes copied at a time when packing and unpacking
+SKIPPED_SUFFIXES = (".part",)  # Files still being written by a generator
+
+
+def walk_pack(input_folder: str):
+    # (path relative to input_folder with "/" separators, full path) of every file, in a stable order
+    for root, dirs, files in os.walk(input_folder):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith(SKIPPED_SUFFIXES):
+                continue
+            full_path = os.path.join(root, filename)
+            yield os.path.relpath(full_path, input_folder).replace(os.sep, "/"), full_path
+
+
+def pack_folder(input_folder: str, archive_file: str) -> tuple:
+    # Write every file of input_folder into one archive: a header, the file contents back to
+    # back and an index of (offset, length, CRC-32, path). Contents are copied in chunks and
+    # the index is spooled to a temporary file, so memory does not grow with the size or the
+    # number of files. Hardlinked files (see --dedup) are stored once; only those are
+    # remembered, one small entry per linked inode. Returns (files, bytes of content stored).
+    entries = 0
+    stored = 0
+    blobs = {}  # (device, inode) -> (offset, length, crc) of hardlinked files already stored
+    with open(archive_file, "wb") as archive, tempfile.TemporaryFile() as index:
+        archive.write(HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, 0))
+        for name, full_path in walk_pack(input_folder):
+            if os.path.abspath(full_path) == os.path.abspath(archive_file):
+                continue
+            stat = os.stat(full_path)
+            inode = (stat.st_dev, stat.st_ino)
+            if stat.st_nlink > 1 and inode in blobs:
+                offset, length, crc = blobs[inode]
+            else:
+                offset = archive.tell()
+                crc = 0
+                with open(full_path, "rb") as source:
+                    while True:
+                        chunk = source.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        crc = zlib.crc32(chunk, crc)
+                        archive.write(chunk)
+                length = archive.tell() - offset
+                stored += length
+                if stat.st_nlink > 1:
+                    blobs[inode] = (offset, length, crc)
+            encoded_name = name.encode("utf-8")
+            index.write(INDEX_ENTRY.pack(offset, length, crc, len(encoded_name)) + encoded_name)
+            entries += 1
+
+        index_offset = archive.tell()
+        index.seek(0)
+        while True:
+            chunk = index.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            archive.write(chunk)
+        archive.seek(0)
+        archive.write(HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, index_offset, entries))
+    return entries, stored
+
+
+class PackArchive:
+    # Random access to the files of an archive through mmap: read(name) returns a
+    # zero-copy memoryview of the file's bytes without touching the rest of the archive.
+    # entries() walks the index in place; the {path: entry} dict that lookups by name
+    # need is only built on first use.
+    def __init__(self, archive_file: str):
+        self._file = open(archive_file, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._index_offset, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            self.close()
+            raise ValueError(f"{archive_file} is not a voice pack archive (version {ARCHIVE_VERSION})")
+        self._index = None
+
+    def entries(self):
+        # (path, (offset, length, crc)) of every file, read from the mapped index as it goes
+        position = self._index_offset
+        for _ in range(self.count):
+            offset, length, crc, name_length = INDEX_ENTRY.unpack_from(self._map, position)
+            position += INDEX_ENTRY.size
+            name = self._map[position:position + name_length].decode("utf-8")
+            position += name_length
+            yield name, (offset, length, crc)
+
+    @property
+    def index(self) -> dict:
+        # Path -> (offset, length, crc)
+        if self._index is None:
+            self._index = dict(self.entries())
+        return self._index
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def names(self) -> list:
+        return list(self.index)
+
+    def read(self, name: str) -> memoryview:
+        # Release the view before close()
+        offset, length, _ = self.index[name]
+        return memoryview(self._map)[offset:offset + length]
+
+    def extract(self, name: str, output_file: str, entry: tuple = None) -> None:
+        # Copy one file out in chunks, checking its CRC-32; written to a .part file first.
+        # entry is the file's (offset, length, crc) when it comes from entries()
+        offset, length, crc = entry or self.index[name]
+        part_file = f"{output_file}.part"
+        actual_crc = 0
+        with open(part_file, "wb") as target:
+            for start in range(offset, offset + length, CHUNK_SIZE):
+                chunk = self._map[start:min(start + CHUNK_SIZE, offset + length)]
+                actual_crc = zlib.crc32(chunk, actual_crc)
+                target.write(chunk)
+        if actual_crc != crc:
+            os.unlink(part_file)
+            raise ValueError(f"{name} is corrupt in the archive (CRC mismatch)")
+        os.replace(part_file, output_file)
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+def safe_output_path(output_folder: str, name: str) -> str:
+    # Refuse names that would land outside output_folder
+    path = os.path.normpath(os.path.join(output_folder, *name.split("/")))
+    if os.path.isabs(name) or os.path.relpath(path, output_folder).startswith(os.pardir):
+        raise ValueError(f"Unsafe path in archive: {name}")
+    return path
+
+
+def unpack_archive(archive_file: str, output_folder: str) -> int:
+    # Restore the folder layout of the archive under output_folder, streaming the index
+    with PackArchive(archive_file) as archive:
+        for name, entry in archive.entries():
+            output_file = safe_output_path(output_folder, name)
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            archive.extract(name, output_file, entry)
+        return archive.count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pack a voice pack folder into a single archive file, list an archive or unpack it."
+    )
+    parser.add_argument("command", choices=["pack", "unpack", "list"], help="Action to run")
+    parser.add_argument("--archive", required=True, help="Path to the archive file")
+    parser.add_argument('--input_folder', help="Folder to pack (pack only)")
+    parser.add_argument('--output_folder', help="Folder the archive is unpacked into (unpack only)")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        if not args.input_folder or not os.path.isdir(args.input_folder):
+            parser.error(f"Folder {args.input_folder} not found.")
+        entries, stored = pack_folder(args.input_folder, args.archive)
+        print(f"Packed {entries} files ({stored / 1024 / 1024:.1f} MB of content) into {args.archive}")
+    elif args.command == "unpack":
+        if not args.output_folder:
+            parser.error("unpack needs --output_folder")
+        entries = unpack_archive(args.archive, args.output_folder)
+        print(f"Unpacked {entries} files into {args.output_folder}")
+    else:
+        with PackArchive(args.archive) as archive:
+            for name, (_, length, _) in archive.entries():
+                print(f"{length:>10}  {name}")
+            print(f"{archive.count} files in {args.archive}")
+
+
+if __name__ == "__main__":
+    main()
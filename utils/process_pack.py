@@ -0,0 +1,144 @@
+import os
+import argparse
+import shutil
+import wave
+import numpy as np
+from batch_executor import add_jobs_argument, collect_wav_files, run_batch
+from audio_dsp import FirStage, GainStage, ResampleStage, float_to_pcm, lowpass_filter, pcm_to_float
+
+RADIO_CUTOFF_HZ = 3000
+RADIO_GAIN_DB = 5
+DEFAULT_BLOCK_FRAMES = 65536  # Frames read, processed and written at a time
+
+# Each stage builder takes (sample_rate, channels, argument) and returns the
+# stateful block processors of the stage and the sample rate they output
+
+
+def lowpass_stage(sample_rate, channels, cutoff_hz):
+    return [FirStage(lowpass_filter(float(cutoff_hz), sample_rate), channels)], sample_rate
+
+
+def gain_stage(sample_rate, channels, gain_db):
+    return [GainStage(float(gain_db))], sample_rate
+
+
+def radio_stage(sample_rate, channels, cutoff_hz):
+    # The radio effect as the README describes it: limit the bandwidth, then make it louder.
+    # Not what radio_filter.py does: that script only resamples to 32 kHz/16 bits.
+    lowpass, _ = lowpass_stage(sample_rate, channels, cutoff_hz or RADIO_CUTOFF_HZ)
+    gain, _ = gain_stage(sample_rate, channels, RADIO_GAIN_DB)
+    return lowpass + gain, sample_rate
+
+
+def resample_stage(sample_rate, channels, new_rate):
+    new_rate = int(new_rate)
+    return [ResampleStage(sample_rate, new_rate, channels)], new_rate
+
+
+STAGES = {
+    "radio": radio_stage,
+    "lowpass": lowpass_stage,
+    "gain": gain_stage,
+    "resample": resample_stage,
+}
+
+
+def parse_stages(specs: list) -> list:
+    # "gain=5" -> ("gain", "5"); "radio" -> ("radio", None)
+    stages = []
+    for spec in specs:
+        name, _, value = spec.partition("=")
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage '{name}', expected one of: {', '.join(STAGES)}")
+        if not value and name != "radio":
+            raise ValueError(f"Stage '{name}' needs a value, e.g. {name}=...")
+        stages.append((name, value or None))
+    return stages
+
+
+def process_file(input_file: str, output_file: str, stages: list, block_frames: int = DEFAULT_BLOCK_FRAMES) -> None:
+    # Decode once, run every stage on the samples, encode once. The file is streamed in
+    # blocks of block_frames and the stages keep their state between blocks, so memory
+    # stays flat however long the file is.
+    with wave.open(input_file, "rb") as source, wave.open(output_file, "wb") as target:
+        channels = source.getnchannels()
+        sample_width = source.getsampwidth()
+        sample_rate = source.getframerate()
+
+        processors = []
+        for name, value in stages:
+            stage_processors, sample_rate = STAGES[name](sample_rate, channels, value)
+            processors += stage_processors
+            if name == "resample":
+                sample_width = 2  # Like reduce_wav_size.py: 16 bits at the new rate
+
+        target.setnchannels(channels)
+        target.setsampwidth(sample_width)
+        target.setframerate(sample_rate)
+
+        while True:
+            data = source.readframes(block_frames)
+            if not data:
+                break
+            block = pcm_to_float(data, source.getsampwidth(), channels)
+            for processor in processors:
+                block = processor.process(block)
+            target.writeframes(float_to_pcm(block, sample_width))
+
+        # Drain what the stages still hold, each tail going through the stages after it
+        block = pcm_to_float(b"", sample_width, channels)
+        for processor in processors:
+            block = processor.process(block)
+            tail = processor.flush()
+            if tail is not None:
+                block = np.concatenate([block, tail])
+        target.writeframes(float_to_pcm(block, sample_width))
+
+
+def process_pack(
+    input_folder: str, output_folder: str, stages: list, jobs: int = None, block_frames: int = DEFAULT_BLOCK_FRAMES
+) -> None:
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Mirror the folder structure, keep the subtitles.csv files and process the WAV files in parallel
+    files = collect_wav_files(input_folder, output_folder)
+    for root, dirs, filenames in os.walk(input_folder):
+        if "subtitles.csv" in filenames:
+            relative_path = os.path.relpath(root, input_folder)
+            shutil.copy2(os.path.join(root, "subtitles.csv"), os.path.join(output_folder, relative_path, "subtitles.csv"))
+    run_batch(process_file, files, (stages, block_frames), jobs)
+
+    print(f"All files have been processed and saved to: {output_folder}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Apply a chain of processing stages to every WAV file in a folder, decoding and encoding each file once."
+    )
+    parser.add_argument('--input_folder', required=True, help="Path to the input folder containing WAV files")
+    parser.add_argument('--output_folder', help="Path to the output folder (default: <input_folder>_processed)")
+    parser.add_argument(
+        '--stages',
+        nargs='+',
+        required=True,
+        help="Ordered stages: radio[=cutoff_hz], lowpass=cutoff_hz, gain=db, resample=rate "
+        "(e.g. --stages radio gain=5 resample=32000)",
+    )
+    parser.add_argument(
+        '--block_frames',
+        type=int,
+        default=DEFAULT_BLOCK_FRAMES,
+        help=f"Frames processed at a time, bounds the memory used per file (default: {DEFAULT_BLOCK_FRAMES})",
+    )
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input_folder):
+        parser.error(f"Folder {args.input_folder} not found.")
+    try:
+        stages = parse_stages(args.stages)
+    except ValueError as e:
+        parser.error(str(e))
+
+    output_folder = args.output_folder or f"{os.path.normpath(args.input_folder)}_processed"
+    process_pack(args.input_folder, output_folder, stages, args.jobs, args.block_frames)
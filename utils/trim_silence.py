@@ -0,0 +1,50 @@
+import os
+import argparse
+import shutil
+from batch_executor import add_jobs_argument, collect_wav_files, run_batch
+from audio_dsp import DEFAULT_TRIM_PADDING_MS, DEFAULT_TRIM_THRESHOLD_DB, trim_wav_file
+
+
+def trim_and_report(input_file: str, output_file: str, threshold_db: float, padding_ms: float, normalize_dbfs: float) -> str:
+    lead_ms, trail_ms = trim_wav_file(input_file, output_file, threshold_db, padding_ms, normalize_dbfs)
+    return f"trimmed {lead_ms:.0f} ms at the start, {trail_ms:.0f} ms at the end"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Trim leading and trailing silence of WAV files and optionally normalize their level."
+    )
+    parser.add_argument('--input_folder', required=True, help="Path to the input folder containing WAV files")
+    parser.add_argument('--output_folder', help="Path to the output folder (default: <input_folder>_trimmed)")
+    parser.add_argument(
+        '--threshold_db',
+        type=float,
+        default=DEFAULT_TRIM_THRESHOLD_DB,
+        help=f"10 ms frames quieter than this RMS level in dBFS count as silence (default: {DEFAULT_TRIM_THRESHOLD_DB})",
+    )
+    parser.add_argument(
+        '--padding_ms',
+        type=float,
+        default=DEFAULT_TRIM_PADDING_MS,
+        help=f"Silence kept before and after the sound (default: {DEFAULT_TRIM_PADDING_MS})",
+    )
+    parser.add_argument(
+        '--normalize_dbfs',
+        type=float,
+        help="If provided, the RMS level of every clip is brought to this dBFS level (peaks stay under -1 dBFS)",
+    )
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input_folder):
+        parser.error(f"Folder {args.input_folder} not found.")
+
+    output_folder = args.output_folder or f"{os.path.normpath(args.input_folder)}_trimmed"
+    files = collect_wav_files(args.input_folder, output_folder)
+    for root, dirs, filenames in os.walk(args.input_folder):
+        if "subtitles.csv" in filenames:
+            relative_path = os.path.relpath(root, args.input_folder)
+            shutil.copy2(os.path.join(root, "subtitles.csv"), os.path.join(output_folder, relative_path, "subtitles.csv"))
+    run_batch(trim_and_report, files, (args.threshold_db, args.padding_ms, args.normalize_dbfs), args.jobs)
+
+    print(f"All files have been processed and saved to: {output_folder}")
@@ -0,0 +1,255 @@
+import os
+import csv
+import sys
+import json
+import mmap
+import struct
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from batch_executor import add_jobs_argument
+from audio_dsp import pcm_to_float
+
+DEFAULT_SILENCE_DBFS = -50.0
+DEFAULT_CLIP_RATIO = 0.001  # Share of samples at full scale above which a clip counts as clipped
+DEFAULT_MIN_DURATION_MS = 100.0
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def parse_wav_header(data) -> dict:
+    # Walk the RIFF chunks up to the data chunk; raises ValueError on anything that is not PCM WAV
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("not a RIFF/WAVE file")
+    header = None
+    position = 12
+    while position + 8 <= len(data):
+        chunk_id = data[position:position + 4]
+        size = int.from_bytes(data[position + 4:position + 8], "little")
+        body = position + 8
+        if chunk_id == b"fmt ":
+            format_tag, channels, sample_rate, _, block_align, bits = struct.unpack_from("<HHIIHH", data, body)
+            if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE):
+                raise ValueError(f"unsupported WAV format {format_tag}")
+            header = {"channels": channels, "sample_rate": sample_rate, "bit_depth": bits, "block_align": block_align}
+        elif chunk_id == b"data":
+            if header is None:
+                raise ValueError("data chunk before fmt chunk")
+            available = len(data) - body
+            header["data_offset"] = body
+            header["data_size"] = min(size, available)
+            header["truncated"] = size > available
+            return header
+        position = body + size + (size & 1)
+    raise ValueError("no data chunk")
+
+
+def full_scale(sample_width: int) -> float:
+    # Largest positive sample of a width, on the 16-bit scale of pcm_to_float
+    # (32767 for 16 bits, but 127 * 256 = 32512 for 8-bit WAVs)
+    top_code = b"\xff" if sample_width == 1 else b"\xff" * (sample_width - 1) + b"\x7f"
+    return float(pcm_to_float(top_code, sample_width, 1)[0, 0])
+
+
+def check_file(path: str, silence_dbfs: float, clip_ratio: float, min_duration_ms: float, headers_only: bool) -> dict:
+    # Format of one WAV file and the problems found in it. Runs in a worker process; the
+    # file is mapped, not read, and 16-bit samples are checked in place as a NumPy view.
+    result = {"issues": []}
+    issues = result["issues"]
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                issues.append("empty file")
+                return result
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                header = parse_wav_header(data)
+                result.update(
+                    {key: header[key] for key in ("channels", "sample_rate", "bit_depth")}
+                )
+                frame_size = header["block_align"]
+                frames = header["data_size"] // frame_size if frame_size else 0
+                result["duration_ms"] = round(1000 * frames / header["sample_rate"], 1) if header["sample_rate"] else 0
+                if header["truncated"] or header["data_size"] % max(frame_size, 1):
+                    issues.append("truncated")
+                if frames == 0:
+                    issues.append("no audio")
+                    return result
+                if result["duration_ms"] < min_duration_ms:
+                    issues.append("too short")
+                if headers_only:
+                    return result
+
+                sample_width = header["bit_depth"] // 8
+                if sample_width == 2:
+                    samples = np.frombuffer(data, dtype="<i2", count=frames * header["channels"], offset=header["data_offset"])
+                else:
+                    raw = data[header["data_offset"]:header["data_offset"] + frames * frame_size]
+                    samples = pcm_to_float(raw, sample_width, header["channels"]).ravel()
+                peak = max(float(samples.max()), -float(samples.min()))
+                top = full_scale(sample_width)
+                clipped = int(np.count_nonzero(samples >= top) + np.count_nonzero(samples <= -top))
+                rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+                del samples  # The view must go before the map is closed
+        result["peak_dbfs"] = round(20 * np.log10(peak / 32768), 1) if peak else None
+        result["rms_dbfs"] = round(20 * np.log10(rms / 32768), 1) if rms else None
+        if result["rms_dbfs"] is None or result["rms_dbfs"] < silence_dbfs:
+            issues.append("silent")
+        if clipped > clip_ratio * frames * result["channels"]:
+            issues.append("clipped")
+    except (OSError, ValueError, struct.error) as e:
+        issues.append(f"corrupt: {e}")
+    return result
+
+
+def check_subtitles(input_folder: str, wav_files: set, subtitles_folders: set) -> list:
+    # subtitles.csv rows whose file is missing, WAVs missing from their folder's
+    # subtitles.csv and folders of WAVs without a subtitles.csv. wav_files and
+    # subtitles_folders are relative to input_folder, with "" for the pack root.
+    wavs_by_folder = defaultdict(set)
+    for path in wav_files:
+        folder, _, filename = path.rpartition("/")
+        wavs_by_folder[folder].add(filename)
+
+    problems = []
+    for folder in sorted(set(wavs_by_folder) | subtitles_folders):
+        wavs = wavs_by_folder.get(folder, set())
+        prefix = f"{folder}/" if folder else ""
+        if folder not in subtitles_folders:
+            problems.append({"path": folder, "issue": "no subtitles.csv"})
+            continue
+        with open(os.path.join(input_folder, folder, "subtitles.csv"), newline="") as csvfile:
+            rows = [row for row in csv.reader(csvfile) if row]
+        listed = set()
+        for row in rows:
+            listed.add(row[0])
+            path = f"{prefix}{row[0]}"
+            if row[0] not in wavs:
+                problems.append({"path": path, "issue": "listed in subtitles.csv but missing"})
+            elif len(row) < 2 or not row[1].strip():
+                problems.append({"path": path, "issue": "empty subtitle"})
+        for filename in sorted(wavs - listed):
+            problems.append({"path": f"{prefix}{filename}", "issue": "not in subtitles.csv"})
+    return problems
+
+
+def validate_pack(
+    input_folder: str,
+    sample_rate: int = None,
+    bit_depth: int = None,
+    silence_dbfs: float = DEFAULT_SILENCE_DBFS,
+    clip_ratio: float = DEFAULT_CLIP_RATIO,
+    min_duration_ms: float = DEFAULT_MIN_DURATION_MS,
+    headers_only: bool = False,
+    jobs: int = None,
+) -> dict:
+    paths = []
+    subtitles_folders = set()
+    for root, dirs, files in os.walk(input_folder):
+        paths += [os.path.join(root, filename) for filename in files if filename.endswith(".wav")]
+        if "subtitles.csv" in files:
+            relative = os.path.relpath(root, input_folder).replace(os.sep, "/")
+            subtitles_folders.add("" if relative == "." else relative)
+    paths.sort()
+
+    jobs = jobs or os.cpu_count() or 1
+    args = (silence_dbfs, clip_ratio, min_duration_ms, headers_only)
+    if jobs == 1:
+        results = [check_file(path, *args) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(len(paths) // (jobs * 8), 1)
+            results = list(executor.map(check_file, paths, *[[arg] * len(paths) for arg in args], chunksize=chunksize))
+
+    # Without an expected format, the most common one in the pack is the reference
+    formats = Counter(
+        (result["sample_rate"], result["bit_depth"], result["channels"]) for result in results if "sample_rate" in result
+    )
+    reference_rate, reference_depth, reference_channels = formats.most_common(1)[0][0] if formats else (None, None, None)
+    sample_rate = sample_rate or reference_rate
+    bit_depth = bit_depth or reference_depth
+
+    files = {}
+    for path, result in zip(paths, results):
+        if "sample_rate" in result:
+            if result["sample_rate"] != sample_rate:
+                result["issues"].append(f"sample rate {result['sample_rate']} instead of {sample_rate}")
+            if result["bit_depth"] != bit_depth:
+                result["issues"].append(f"{result['bit_depth']} bits instead of {bit_depth}")
+            if result["channels"] != reference_channels:
+                result["issues"].append(f"{result['channels']} channels instead of {reference_channels}")
+        files[os.path.relpath(path, input_folder).replace(os.sep, "/")] = result
+
+    subtitles = check_subtitles(input_folder, set(files), subtitles_folders)
+    issue_counts = Counter(issue.split(":")[0] for result in files.values() for issue in result["issues"])
+    issue_counts.update(problem["issue"] for problem in subtitles)
+    return {
+        "summary": {
+            "files": len(files),
+            "files_with_issues": sum(1 for result in files.values() if result["issues"]),
+            "subtitles_problems": len(subtitles),
+            "sample_rate": sample_rate,
+            "bit_depth": bit_depth,
+            "issues": dict(issue_counts),
+        },
+        "files": {path: result for path, result in files.items() if result["issues"]},
+        "subtitles": subtitles,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check every WAV file and subtitles.csv of a voice pack and write a JSON report."
+    )
+    parser.add_argument('--input_folder', required=True, help="Path to the pack folder")
+    parser.add_argument('--report', help="Write the JSON report to this file (default: print it)")
+    parser.add_argument('--sample_rate', type=int, help="Expected sample rate (default: the most common one)")
+    parser.add_argument('--bit_depth', type=int, help="Expected bits per sample (default: the most common one)")
+    parser.add_argument(
+        '--silence_dbfs',
+        type=float,
+        default=DEFAULT_SILENCE_DBFS,
+        help=f"Clips with an RMS level under this are reported as silent (default: {DEFAULT_SILENCE_DBFS})",
+    )
+    parser.add_argument(
+        '--clip_ratio',
+        type=float,
+        default=DEFAULT_CLIP_RATIO,
+        help=f"Share of samples at full scale above which a clip is reported as clipped (default: {DEFAULT_CLIP_RATIO})",
+    )
+    parser.add_argument(
+        '--min_duration_ms',
+        type=float,
+        default=DEFAULT_MIN_DURATION_MS,
+        help=f"Clips shorter than this are reported (default: {DEFAULT_MIN_DURATION_MS})",
+    )
+    parser.add_argument('--headers_only', action='store_true', help="Only check the WAV headers, not the samples")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input_folder):
+        parser.error(f"Folder {args.input_folder} not found.")
+
+    report = validate_pack(
+        args.input_folder,
+        args.sample_rate,
+        args.bit_depth,
+        args.silence_dbfs,
+        args.clip_ratio,
+        args.min_duration_ms,
+        args.headers_only,
+        args.jobs,
+    )
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    summary = report["summary"]
+    print(
+        f"Checked {summary['files']} files: {summary['files_with_issues']} with issues, "
+        f"{summary['subtitles_problems']} subtitles.csv problems",
+        file=sys.stderr,
+    )
+    sys.exit(1 if summary["files_with_issues"] or summary["subtitles_problems"] else 0)